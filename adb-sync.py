@@ -17,6 +17,7 @@
 
 from __future__ import unicode_literals
 import argparse
+import concurrent.futures
 import locale
 import logging
 import os
@@ -24,10 +25,99 @@ import re
 import stat
 import subprocess
 import time
+import zlib
 from types import TracebackType
 from typing import Callable, cast, Dict, List, IO, Iterable, Optional, Tuple, Type
 
 
+# Extensions whose contents are already compressed; adb's transport
+# compression would only burn CPU time on these.
+INCOMPRESSIBLE_EXTENSIONS = frozenset([
+    b'.7z', b'.apk', b'.bz2', b'.chd', b'.cso', b'.gz', b'.jpeg', b'.jpg',
+    b'.m4a', b'.mkv', b'.mp3', b'.mp4', b'.ogg', b'.pbp', b'.png', b'.rar',
+    b'.rvz', b'.webm', b'.webp', b'.xz', b'.zip', b'.zst'
+])
+
+# Extensions known to compress well (text, gamelists and raw ROM images).
+COMPRESSIBLE_EXTENSIONS = frozenset([
+    b'.a26', b'.bin', b'.cfg', b'.cue', b'.gb', b'.gba', b'.gbc', b'.gen',
+    b'.gg', b'.img', b'.iso', b'.json', b'.list', b'.lnx', b'.m3u', b'.md',
+    b'.n64', b'.nds', b'.nes', b'.pce', b'.sav', b'.sfc', b'.smc', b'.sms',
+    b'.srm', b'.txt', b'.v64', b'.ws', b'.xml', b'.z64'
+])
+
+# Files smaller than this are never worth compressing.
+MIN_COMPRESS_SIZE = 4096
+
+# Size of each sample read by EstimateCompressionRatio.
+COMPRESS_SAMPLE_SIZE = 64 * 1024
+
+# Compress when the sampled data shrinks to at most this fraction.
+COMPRESS_RATIO_THRESHOLD = 0.9
+
+# Read size used when streaming a pulled file into its local copy.
+PULL_CHUNK_SIZE = 1024 * 1024
+
+# First platform-tools release whose push/pull accept '-z any' and '-Z'.
+MIN_COMPRESSION_ADB_VERSION = 31
+
+
+def EstimateCompressionRatio(path: bytes, size: int) -> float:
+  """Estimates how well a local file compresses.
+
+  Compresses up to three samples (start, middle and end of the file) with a
+  fast zlib level, so the check costs a few hundred KB of reads at most.
+
+  Args:
+    path: Local file name.
+    size: Size of the file in bytes.
+
+  Returns:
+    Compressed size divided by original size of the samples (1.0 if the file
+    cannot be read).
+  """
+  offsets = sorted(set([0, max(0, size // 2 - COMPRESS_SAMPLE_SIZE // 2),
+                        max(0, size - COMPRESS_SAMPLE_SIZE)]))
+  raw = 0
+  packed = 0
+  try:
+    with open(path, 'rb') as f:
+      for offset in offsets:
+        f.seek(offset)
+        data = f.read(COMPRESS_SAMPLE_SIZE)
+        raw += len(data)
+        packed += len(zlib.compress(data, 1))
+  except OSError:
+    return 1.0
+  if not raw:
+    return 1.0
+  return min(1.0, packed / raw)
+
+
+def ChooseCompression(path: bytes, size: int,
+                      can_sample: bool) -> Tuple[bool, float]:
+  """Decides whether to transfer a file with adb compression.
+
+  Args:
+    path: File name (local if can_sample is true).
+    size: Size of the file in bytes.
+    can_sample: Whether path is local and may be read for a sample check.
+
+  Returns:
+    compress: Whether to request a compressed transfer.
+    ratio: Estimated compressed/original size ratio (1.0 if unknown).
+  """
+  ext = os.path.splitext(path)[1].lower()
+  if size < MIN_COMPRESS_SIZE or ext in INCOMPRESSIBLE_EXTENSIONS:
+    return False, 1.0
+  if not can_sample:
+    return ext in COMPRESSIBLE_EXTENSIONS, 1.0
+  ratio = EstimateCompressionRatio(path, size)
+  if ext in COMPRESSIBLE_EXTENSIONS:
+    return True, ratio
+  return ratio <= COMPRESS_RATIO_THRESHOLD, ratio
+
+
 class OSLike(object):
 
   def listdir(self, path: bytes) -> Iterable[bytes]:  # os's name, so pylint: disable=g-bad-name
@@ -92,6 +182,7 @@ class AdbFileSystem(GlobLike, OSLike):
 
   def __init__(self, adb: List[bytes]) -> None:
     self.stat_cache = {}  # type: Dict[bytes, os.stat_result]
+    self.listdir_cache = {}  # type: Dict[bytes, List[Tuple[bytes, os.stat_result]]]
     self.adb = adb
 
   # Regarding parsing stat results, we only care for the following fields:
@@ -227,8 +318,55 @@ class AdbFileSystem(GlobLike, OSLike):
         return False
     return True
 
+  def PrefetchTree(self, path: bytes) -> None:
+    """Caches a recursive listing of path using a single 'ls -alR' call.
+
+    Later listdir calls below path are answered from this cache instead of
+    running one 'ls' per directory. If the listing fails, nothing is cached
+    and listdir falls back to asking the device directory by directory.
+
+    Args:
+      path: Remote directory to list.
+    """
+    root = path.rstrip(b'/')
+    listings = {}  # type: Dict[bytes, List[Tuple[bytes, os.stat_result]]]
+    current = None  # type: Optional[bytes]
+    try:
+      with Stdout(self.adb +
+                  [b'shell',
+                   b'ls -alR %s' % (self.QuoteArgument(path + b'/'),)]) as stdout:
+        for line in stdout:
+          line = line.rstrip(b'\r\n')
+          if not line or line.startswith(b'total '):
+            continue
+          if line.endswith(b':') and line.startswith(root):
+            # Header line starting the listing of a (sub)directory.
+            current = re.sub(b'/+', b'/', line[:-1]).rstrip(b'/')
+            listings[current] = []
+            continue
+          if current is None:
+            continue
+          try:
+            statdata, filename = self.LsToStat(line)
+          except OSError:
+            continue
+          if filename is not None:
+            listings[current].append((filename, statdata))
+    except OSError:
+      logging.info('Recursive listing of %r failed; listing per directory.',
+                   path)
+      return
+    self.listdir_cache.update(listings)
+
   def listdir(self, path: bytes) -> Iterable[bytes]:  # os's name, so pylint: disable=g-bad-name
     """List the contents of a directory, caching them for later lstat calls."""
+    cached = self.listdir_cache.pop(
+        re.sub(b'/+', b'/', path).rstrip(b'/'), None)
+    if cached is not None:
+      for filename, statdata in cached:
+        self.stat_cache[path + b'/' + filename] = statdata
+        yield filename
+      return
     with Stdout(self.adb +
                 [b'shell',
                  b'ls -al %s' % (self.QuoteArgument(path + b'/'),)]) as stdout:
@@ -325,16 +463,76 @@ class AdbFileSystem(GlobLike, OSLike):
       for line in stdout:
         yield line.rstrip(b'\r\n')
 
-  def Push(self, src: bytes, dst: bytes) -> None:
+  ADB_VERSION_RE = re.compile(br'^Version (\d+)\.', re.MULTILINE)
+
+  def SupportsCompression(self) -> bool:
+    """Tests whether this adb accepts the push/pull compression options."""
+    try:
+      output = subprocess.check_output(self.adb + [b'version'],
+                                       stderr=subprocess.STDOUT)
+    except (OSError, subprocess.CalledProcessError):
+      return False
+    # Releases before 30 print only 'Android Debug Bridge version 1.0.x'.
+    match = self.ADB_VERSION_RE.search(output)
+    return (match is not None and
+            int(match.group(1)) >= MIN_COMPRESSION_ADB_VERSION)
+
+  def CompressionArgs(self, compress: Optional[bool]) -> List[bytes]:
+    # None leaves the choice to adb; otherwise force compression on or off.
+    if compress is None:
+      return []
+    if compress:
+      return [b'-z', b'any']
+    return [b'-Z']
+
+  def Push(self, src: bytes, dst: bytes,
+           compress: Optional[bool] = None) -> None:
     """Push a file from the local file system to the Android device."""
-    if subprocess.call(self.adb + [b'push', src, dst]) != 0:
+    if subprocess.call(self.adb + [b'push'] + self.CompressionArgs(compress) +
+                       [src, dst]) != 0:
       raise OSError('push failed')
 
-  def Pull(self, src: bytes, dst: bytes) -> None:
+  def Pull(self, src: bytes, dst: bytes,
+           compress: Optional[bool] = None) -> None:
     """Pull a file from the Android device to the local file system."""
-    if subprocess.call(self.adb + [b'pull', src, dst]) != 0:
+    if subprocess.call(self.adb + [b'pull'] + self.CompressionArgs(compress) +
+                       [src, dst]) != 0:
       raise OSError('pull failed')
 
+  def PullStream(self, src: bytes, dst: bytes, size: int) -> None:
+    """Pull a regular file by streaming it into a preallocated local file.
+
+    The local file is sized up front so the file system can reserve the whole
+    extent at once, then filled from 'adb exec-out cat'. exec-out neither
+    returns cat's exit status nor separates its stderr, so a failed cat would
+    leave its error message as the file content; any length other than the
+    expected size is therefore treated as a failed pull.
+
+    Args:
+      src: Remote file name.
+      dst: Local file name.
+      size: Expected size of the file in bytes (from the cached remote stat).
+    """
+    with open(dst, 'wb') as f:
+      if size:
+        try:
+          os.posix_fallocate(f.fileno(), 0, size)
+        except (AttributeError, OSError):
+          f.truncate(size)
+      with Stdout(self.adb +
+                  [b'exec-out',
+                   b'cat %s' % (self.QuoteArgument(src),)]) as stdout:
+        written = 0
+        while True:
+          data = stdout.read(PULL_CHUNK_SIZE)
+          if not data:
+            break
+          f.write(data)
+          written += len(data)
+      if written != size:
+        raise OSError('pull failed: got %d of %d bytes for %r' %
+                      (written, size, src))
+
 
 def BuildFileList(fs: OSLike, path: bytes, follow_links: bool,
                   prefix: bytes) -> Iterable[Tuple[bytes, os.stat_result]]:
@@ -473,7 +671,8 @@ class FileSyncer(object):
                local_to_remote: bool, remote_to_local: bool,
                preserve_times: bool, delete_missing: bool,
                allow_overwrite: bool, allow_replace: bool, copy_links: bool,
-               dry_run: bool) -> None:
+               dry_run: bool, compression: str = 'auto',
+               jobs: int = 1) -> None:
     self.local = local_path
     self.remote = remote_path
     self.adb = adb
@@ -485,7 +684,11 @@ class FileSyncer(object):
     self.allow_replace = allow_replace
     self.copy_links = copy_links
     self.dry_run = dry_run
+    self.compression = compression
+    self.jobs = jobs
     self.num_bytes = 0
+    self.num_wire_bytes = 0.0
+    self.num_compressed = 0
     self.start_time = time.time()
 
   # Attributes filled in later.
@@ -500,7 +703,7 @@ class FileSyncer(object):
   dst = None  # type: Tuple[bytes, bytes]
   dst_fs = None  # type: Tuple[OSLike, OSLike]
   push = None  # type: Tuple[str, str]
-  copy = None  # type: Tuple[Callable[[bytes, bytes], None], Callable[[bytes, bytes], None]]
+  copy = None  # type: Tuple[Callable[[bytes, bytes, Optional[bool]], None], Callable[[bytes, bytes, Optional[bool]], None]]
 
   def IsWorking(self) -> bool:
     """Tests the adb connection."""
@@ -509,6 +712,8 @@ class FileSyncer(object):
   def ScanAndDiff(self) -> None:
     """Scans the local and remote locations and identifies differences."""
     logging.info('Scanning and diffing...')
+    if self.remote_to_local:
+      self.adb.PrefetchTree(self.remote)
     locallist = BuildFileList(
         cast(OSLike, os), self.local, self.copy_links, b'')
     remotelist = BuildFileList(self.adb, self.remote, self.copy_links, b'')
@@ -621,10 +826,100 @@ class FileSyncer(object):
     for i in [0, 1]:
       self.src_only[i][:0] = src_only_prepend[i]
 
+  def ChooseCompression(self, i: int, src_name: bytes,
+                        s: os.stat_result) -> Optional[bool]:
+    """Picks the adb compression mode for one file and accounts its bytes.
+
+    Args:
+      i: Direction index (0 = push, 1 = pull).
+      src_name: Source file name.
+      s: Stat result of the source file.
+
+    Returns:
+      True/False to force compression on/off, or None to let adb decide.
+    """
+    size = s.st_size if stat.S_ISREG(s.st_mode) else 0
+    if self.compression == 'adb':
+      self.num_wire_bytes += size
+      return None
+    if self.compression == 'never':
+      self.num_wire_bytes += size
+      return False
+    # Only pushes can sample the (local) source for compressibility.
+    compress, ratio = ChooseCompression(src_name, size, i == 0)
+    if self.compression == 'always':
+      compress = True
+    if compress:
+      self.num_compressed += 1
+      self.num_wire_bytes += size * ratio
+      logging.info('%s-Compressed: %r (est. ratio %.2f)', self.push[i],
+                   src_name, ratio)
+    else:
+      self.num_wire_bytes += size
+    return compress
+
+  def PullOne(self, src_name: bytes, dst_name: bytes, s: os.stat_result,
+              compress: Optional[bool]) -> None:
+    """Pull a single file and set its local times (runs on a worker thread)."""
+    with DeleteInterruptedFile(self.dry_run, cast(OSLike, os), dst_name):
+      if stat.S_ISREG(s.st_mode) and not compress:
+        self.adb.PullStream(src_name, dst_name, s.st_size)
+      else:
+        self.adb.Pull(src_name, dst_name, compress)
+    if self.preserve_times:
+      # The remote stat is already cached, so this is purely local.
+      os.utime(dst_name, (s.st_atime, s.st_mtime))
+
+  def PerformParallelPulls(self) -> None:
+    """Pull all remote-only files using up to self.jobs concurrent transfers.
+
+    Directories are created up front, and their times are set only after all
+    files are in place so that the pulls do not bump them again.
+    """
+    dirs = []  # type: List[Tuple[bytes, os.stat_result]]
+    files = []  # type: List[Tuple[bytes, bytes, os.stat_result, Optional[bool]]]
+    for name, s in self.src_only[1]:
+      src_name = self.src[1] + name
+      dst_name = self.dst[1] + name
+      logging.info('Pull: %r', dst_name)
+      if stat.S_ISDIR(s.st_mode):
+        if not self.dry_run:
+          self.dst_fs[1].makedirs(dst_name)
+        dirs.append((dst_name, s))
+      else:
+        compress = self.ChooseCompression(1, src_name, s)
+        files.append((src_name, dst_name, s, compress))
+    if self.dry_run:
+      for _, _, s, _ in files:
+        if stat.S_ISREG(s.st_mode):
+          self.num_bytes += s.st_size
+      return
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.jobs)
+    try:
+      futures = {
+          executor.submit(self.PullOne, src_name, dst_name, s, compress): s
+          for src_name, dst_name, s, compress in files
+      }
+      for future in concurrent.futures.as_completed(futures):
+        future.result()
+        s = futures[future]
+        if stat.S_ISREG(s.st_mode):
+          self.num_bytes += s.st_size
+    except BaseException:
+      executor.shutdown(wait=True, cancel_futures=True)
+      raise
+    executor.shutdown(wait=True)
+    if self.preserve_times:
+      for dst_name, s in reversed(dirs):
+        os.utime(dst_name, (s.st_atime, s.st_mtime))
+
   def PerformCopies(self) -> None:
     """Perform all copying necessary for the file sync operation."""
     for i in [0, 1]:
       if self.src_to_dst[i]:
+        if i == 1 and self.jobs > 1:
+          self.PerformParallelPulls()
+          continue
         for name, s in self.src_only[i]:
           src_name = self.src[i] + name
           dst_name = self.dst[i] + name
@@ -634,8 +929,9 @@ class FileSyncer(object):
               self.dst_fs[i].makedirs(dst_name)
           else:
             with DeleteInterruptedFile(self.dry_run, self.dst_fs[i], dst_name):
+              compress = self.ChooseCompression(i, src_name, s)
               if not self.dry_run:
-                self.copy[i](src_name, dst_name)
+                self.copy[i](src_name, dst_name, compress)
               if stat.S_ISREG(s.st_mode):
                 self.num_bytes += s.st_size
           if not self.dry_run:
@@ -655,6 +951,13 @@ class FileSyncer(object):
       rate = self.num_bytes / 1024.0 / dt
       logging.info('Total: %d KB/s (%d bytes in %.3fs)', rate, self.num_bytes,
                    dt)
+    if self.num_compressed:
+      # Wire bytes are estimated from the sampled compression ratios.
+      speedup = 1.0
+      if self.num_wire_bytes:
+        speedup = self.num_bytes / self.num_wire_bytes
+      logging.info('Wire: ~%d bytes, %d files compressed (~%.2fx effective)',
+                   self.num_wire_bytes, self.num_compressed, speedup)
 
 
 def ExpandWildcards(globber: GlobLike, path: bytes) -> Iterable[bytes]:
@@ -792,6 +1095,21 @@ def main() -> None:
       '--copy-links',
       action='store_true',
       help='transform symlink into referent file/dir')
+  parser.add_argument(
+      '--compression',
+      choices=['auto', 'always', 'never', 'adb'],
+      default='auto',
+      help='Transfer compression. "auto" picks it per file from the extension '
+      'and a quick sample check; "adb" leaves it to adb\'s own default. Older '
+      'adb (before 31) does not support choosing, so "adb" is used there.')
+  parser.add_argument(
+      '-j',
+      '--jobs',
+      metavar='N',
+      type=int,
+      default=1,
+      help='Number of concurrent pulls when copying from the device '
+      '(-R or -2). Pulled files are preallocated locally.')
   parser.add_argument(
       '--dry-run',
       action='store_true',
@@ -812,6 +1130,12 @@ def main() -> None:
   if args.port:
     adb_args += [b'-P', os.fsencode(args.port)]
   adb = AdbFileSystem(adb_args)
+  compression = args.compression
+  if compression != 'adb' and not adb.SupportsCompression():
+    logging.warning(
+        'adb is older than %d and cannot choose compression per file; '
+        'using --compression=adb.', MIN_COMPRESSION_ADB_VERSION)
+    compression = 'adb'
 
   # Expand wildcards, but only on the remote side.
   localpaths = []
@@ -866,7 +1190,8 @@ def main() -> None:
     logging.info('Sync: local %r, remote %r', localpaths[i], remotepaths[i])
     syncer = FileSyncer(adb, localpaths[i], remotepaths[i], local_to_remote,
                         remote_to_local, preserve_times, delete_missing,
-                        allow_overwrite, allow_replace, copy_links, dry_run)
+                        allow_overwrite, allow_replace, copy_links, dry_run,
+                        compression, max(1, args.jobs))
     if not syncer.IsWorking():
       logging.error('Device not connected or not working.')
       return
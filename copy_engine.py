@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+
+"""Built-in mirror/update copy engine shared by sync_to_externalHD.py and miyoo_sync.py.
+
+Used when rsync/robocopy are missing or when the native engine is asked for, so both
+scripts behave the same on every OS. Run this file with --benchmark to compare it
+against rsync on a synthetic ROM tree.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import platform
+import argparse
+import tempfile
+import subprocess
+import threading
+from fnmatch import fnmatch
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+BUFFER_SIZE = 8 * 1024 * 1024   # Large, page-aligned buffer for the read/write fallback
+MTIME_WINDOW = 2                # Seconds; FAT/exFAT and robocopy /FFT granularity
+PART_SUFFIX = ".part"           # Temp files are renamed over the target once complete
+
+is_windows = platform.system() == "Windows"
+
+
+# ========= STAT CACHE =========
+
+def cache_dir() -> Path:
+    base = os.environ.get("LOCALAPPDATA") if is_windows else os.environ.get("XDG_CACHE_HOME")
+    return Path(base or Path.home() / ".cache") / "rom_scripts" / "copy_engine"
+
+
+def manifest_path(dst: Path) -> Path:
+    return cache_dir() / (hashlib.sha1(str(Path(dst).resolve()).encode("utf-8")).hexdigest() + ".json")
+
+
+def volume_id(dst: Path):
+    """Changes when a different drive is mounted at the same path, which invalidates the cache."""
+    st = os.stat(dst)
+    return [st.st_dev, st.st_ino]
+
+
+def load_manifest(dst: Path):
+    """[src size, src mtime_ns, dst size, dst mtime_ns] from the last sync, keyed by relative path."""
+    try:
+        with open(manifest_path(dst), encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("volume") == volume_id(dst):
+            return data["files"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return {}
+
+
+def save_manifest(dst: Path, files):
+    path = manifest_path(dst)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"volume": volume_id(dst), "files": files}, f)
+    os.replace(tmp_path, path)
+
+
+# ========= SCANNING =========
+
+def is_excluded(name, excludes):
+    return any(fnmatch(name, pattern) for pattern in excludes)
+
+
+def scan(root: Path, excludes):
+    """Return ({rel_path: (size, mtime_ns)}, {rel_dir}) for everything under root."""
+    files = {}
+    dirs = set()
+    stack = [""]
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            entries = os.scandir(os.path.join(root, rel_dir))
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if is_excluded(entry.name, excludes) or entry.name.endswith(PART_SUFFIX):
+                    continue
+                rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if entry.is_dir():
+                    dirs.add(rel)
+                    stack.append(rel)
+                elif entry.is_file():
+                    st = entry.stat()
+                    files[rel] = (st.st_size, st.st_mtime_ns)
+    return files, dirs
+
+
+# ========= COPYING =========
+
+def _copy_range(fsrc, fdst, size):
+    """Kernel-side copy; returns False when the platform or filesystem pair cannot do it."""
+    src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+    copied = 0
+    for name in ("copy_file_range", "sendfile"):
+        func = getattr(os, name, None)
+        if func is None or is_windows:
+            continue
+        try:
+            while copied < size:
+                if name == "copy_file_range":
+                    sent = func(src_fd, dst_fd, min(size - copied, 1 << 30))
+                else:
+                    sent = func(dst_fd, src_fd, copied, min(size - copied, 1 << 30))
+                if sent == 0:
+                    break
+                copied += sent
+            return copied == size
+        except OSError:
+            # EXDEV/ENOSYS/EINVAL: retry from the start with the next method.
+            if copied:
+                fsrc.seek(0)
+                fdst.seek(0)
+                fdst.truncate()
+                copied = 0
+    return False
+
+
+def _copy_buffered(fsrc, fdst):
+    buf = bytearray(BUFFER_SIZE)
+    view = memoryview(buf)
+    while True:
+        n = fsrc.readinto(buf)
+        if not n:
+            break
+        fdst.write(view[:n])
+
+
+def copy_file(src: Path, dst: Path, size, mtime_ns):
+    """Copy to a temp file next to dst, stamp the source mtime, then rename it into place."""
+    tmp_path = dst.with_name(dst.name + PART_SUFFIX)
+    try:
+        with open(src, "rb") as fsrc, open(tmp_path, "wb") as fdst:
+            if not _copy_range(fsrc, fdst, size):
+                fsrc.seek(0)
+                fdst.seek(0)
+                fdst.truncate()
+                _copy_buffered(fsrc, fdst)
+        os.utime(tmp_path, ns=(mtime_ns, mtime_ns))
+        os.replace(tmp_path, dst)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def needs_copy(rel, stats, dst_files, manifest, size_only):
+    if rel not in dst_files:
+        return True
+    size, mtime_ns = stats
+    current = dst_files[rel]
+    # Neither side changed since we last wrote it; a destination that was modified
+    # or truncated behind our back no longer matches and gets compared normally.
+    if manifest.get(rel) == [size, mtime_ns, current[0], current[1]]:
+        return False
+    if size_only:
+        return current[0] != size
+    return current[0] != size or abs(current[1] - mtime_ns) > MTIME_WINDOW * 1_000_000_000
+
+
+def sync_tree(src, dst, mirror=False, excludes=(), size_only=False, workers=4, dry_run=False, progress=None):
+    """Update or mirror src into dst and return change records ({"action", "size", "path"})."""
+    src, dst = Path(src), Path(dst)
+    excludes = list(excludes)
+    if not dry_run:
+        dst.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(dst) if dst.exists() else {}
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        src_scan = pool.submit(scan, src, excludes)
+        dst_files, dst_dirs = pool.submit(scan, dst, excludes).result()
+        src_files, src_dirs = src_scan.result()
+
+    records = []
+    to_copy = []
+    for rel, stats in src_files.items():
+        if needs_copy(rel, stats, dst_files, manifest, size_only):
+            records.append({"action": "update" if rel in dst_files else "add", "size": stats[0], "path": rel})
+            to_copy.append(rel)
+    for rel in sorted(src_dirs - dst_dirs):
+        records.append({"action": "mkdir", "size": None, "path": rel + "/"})
+
+    extra_files = sorted(set(dst_files) - set(src_files))
+    # Only the topmost missing directory needs removing.
+    extra_dirs = sorted(d for d in dst_dirs - src_dirs if os.path.dirname(d) not in dst_dirs - src_dirs)
+    if mirror:
+        for rel in extra_files:
+            if not any(rel.startswith(d + "/") for d in extra_dirs):
+                records.append({"action": "delete", "size": None, "path": rel})
+        for rel in extra_dirs:
+            records.append({"action": "delete", "size": None, "path": rel + "/"})
+    else:
+        records.extend({"action": "extra", "size": None, "path": rel} for rel in extra_files)
+
+    if dry_run:
+        return records
+
+    for rel in sorted(src_dirs - dst_dirs):
+        (dst / rel).mkdir(parents=True, exist_ok=True)
+
+    total = sum(src_files[rel][0] for rel in to_copy) or 1
+    done = [0]
+    lock = threading.Lock()
+
+    def copy_one(rel):
+        size, mtime_ns = src_files[rel]
+        copy_file(src / rel, dst / rel, size, mtime_ns)
+        # FAT/exFAT round the mtime we set, so remember what the destination actually holds.
+        st = os.stat(dst / rel)
+        with lock:
+            dst_files[rel] = (st.st_size, st.st_mtime_ns)
+            done[0] += size
+            if progress:
+                progress(f"{done[0] * 100 // total}%")
+
+    # Largest files first so one big file does not finish alone at the end.
+    to_copy.sort(key=lambda rel: src_files[rel][0], reverse=True)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for _ in pool.map(copy_one, to_copy):
+            pass
+
+    if mirror:
+        for rel in extra_dirs:
+            shutil.rmtree(dst / rel, ignore_errors=True)
+        for rel in extra_files:
+            if not any(rel.startswith(d + "/") for d in extra_dirs):
+                os.remove(dst / rel)
+
+    save_manifest(dst, {rel: [size, mtime_ns, *dst_files[rel]]
+                        for rel, (size, mtime_ns) in src_files.items() if rel in dst_files})
+    return records
+
+
+# ========= BENCHMARK =========
+
+def make_synthetic_tree(root: Path, small_files, large_files, large_mb):
+    """A ROM-like tree: a few large disc images plus many small media files."""
+    rng = os.urandom
+    (root / "psx").mkdir(parents=True)
+    (root / "snes" / "media" / "images").mkdir(parents=True)
+    for i in range(large_files):
+        with open(root / "psx" / f"Game {i}.chd", "wb") as f:
+            for _ in range(large_mb):
+                f.write(rng(1024 * 1024))
+    for i in range(small_files):
+        (root / "snes" / ("media/images" if i % 2 else "") / f"Game {i}.sfc").write_bytes(rng(2048 + (i * 977) % 60000))
+
+
+def timed(label, func):
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f"   {label:<28} {elapsed:8.2f}s")
+    return elapsed
+
+
+def benchmark(small_files, large_files, large_mb, workers):
+    with tempfile.TemporaryDirectory(prefix="copy_engine_bench_") as tmp:
+        tmp = Path(tmp)
+        src = tmp / "src"
+        print(f"🧪 Building synthetic tree: {large_files} × {large_mb} MB + {small_files} small files...")
+        make_synthetic_tree(src, small_files, large_files, large_mb)
+        os.environ["XDG_CACHE_HOME"] = str(tmp / "cache")
+        os.environ["LOCALAPPDATA"] = str(tmp / "cache")
+
+        print("\n⏱️  Results")
+        timed("native: initial copy", lambda: sync_tree(src, tmp / "native", mirror=True, workers=workers))
+        timed("native: no-op resync", lambda: sync_tree(src, tmp / "native", mirror=True, workers=workers))
+        if shutil.which("rsync"):
+            rsync = ["rsync", "-a", "--delete", f"{src}/", f"{tmp / 'rsync'}/"]
+            timed("rsync: initial copy", lambda: subprocess.run(rsync, check=True))
+            timed("rsync: no-op resync", lambda: subprocess.run(rsync, check=True))
+        else:
+            print("   rsync not found — skipping rsync runs")
+        if shutil.which("robocopy"):
+            robocopy = ["robocopy", str(src), str(tmp / "robocopy"), "/MIR", "/NFL", "/NDL", "/NJH", "/NJS", "/NP"]
+            timed("robocopy: initial copy", lambda: subprocess.run(robocopy))
+            timed("robocopy: no-op resync", lambda: subprocess.run(robocopy))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Native mirror/update copy engine.")
+    parser.add_argument("src", nargs="?", help="Source folder")
+    parser.add_argument("dst", nargs="?", help="Destination folder")
+    parser.add_argument("--mirror", action="store_true", help="Delete destination files that are not in the source")
+    parser.add_argument("--size-only", action="store_true", help="Compare by size only, ignoring timestamps")
+    parser.add_argument("--dry-run", action="store_true", help="Only list what would change")
+    parser.add_argument("--exclude", action="append", default=[], help="File or folder name pattern to skip")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel file copies (default: 4)")
+    parser.add_argument("--benchmark", action="store_true", help="Compare against rsync on a synthetic ROM tree")
+    parser.add_argument("--small-files", type=int, default=2000, help="Benchmark: number of small files (default: 2000)")
+    parser.add_argument("--large-files", type=int, default=4, help="Benchmark: number of disc images (default: 4)")
+    parser.add_argument("--large-mb", type=int, default=64, help="Benchmark: size of each disc image in MB (default: 64)")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.small_files, args.large_files, args.large_mb, args.workers)
+        return 0
+    if not args.src or not args.dst:
+        parser.error("src and dst are required unless --benchmark is given")
+
+    records = sync_tree(args.src, args.dst, mirror=args.mirror, excludes=args.exclude, size_only=args.size_only,
+                        workers=args.workers, dry_run=args.dry_run,
+                        progress=lambda text: print(f"\r{text}", end="", flush=True))
+    print("\r" + " " * 5 + "\r", end="")
+    for record in records:
+        print(f"{record['action']:<7} {record['path']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,49 +1,506 @@
 import sys
 import os
+import json
+import hashlib
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict, OrderedDict
+from heapq import merge
 
 from PyQt5.QtWidgets import (
-    QApplication, QWidget, QLabel, QPushButton, QListWidget,
+    QApplication, QWidget, QLabel, QPushButton, QListView, QAbstractItemView,
     QVBoxLayout, QHBoxLayout, QFileDialog, QMessageBox, QLineEdit,
-    QMenuBar, QMenu, QStyle, QToolButton
+    QMenuBar, QMenu, QStyle, QToolButton, QComboBox, QCheckBox, QDoubleSpinBox
 )
-from PyQt5.QtCore import Qt, QTimer, QRunnable, QThreadPool, QObject, pyqtSignal
+from PyQt5.QtCore import (
+    Qt, QTimer, QRunnable, QThreadPool, QObject, pyqtSignal,
+    QAbstractListModel, QModelIndex, QStandardPaths, QSize
+)
+from PyQt5.QtGui import QImage, QPixmap, QKeySequence
+
+
+MIN_SEARCH_LENGTH = 4
+SEARCH_DEBOUNCE_MS = 150
+# Moves up to this size update the panes row by row; larger ones rebuild
+# the member arrays with a single merge.
+INCREMENTAL_MOVE_LIMIT = 200
+# Moves of at least this many entries are computed on a worker thread.
+BACKGROUND_MOVE_THRESHOLD = 20000
+MOVE_PROGRESS_STEP = 5000
+MEDIA_ROOT = "Y:/ES-DE/ES-DE/downloaded_media"
+BYTES_PER_GB = 1000 ** 3
+PREVIEW_SIZE = QSize(320, 240)
+PREVIEW_CACHE_SIZE = 200
+PREVIEW_PREFETCH = 3
+# Media folders to take previews from, most preferred first.
+PREVIEW_FOLDERS = ("miximages", "covers", "screenshots", "titlescreens")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+
+def local_source_dir(orig_source_dir):
+    """Map the server path stored in a .list file to the local share."""
+    return os.path.normpath(orig_source_dir.replace("/mnt/user/Stuff/", "Y:/"))
+
+
+def snapshot_path(source_dir):
+    """Path of the cached directory listing for `source_dir`."""
+    cache_root = QStandardPaths.writableLocation(QStandardPaths.GenericCacheLocation)
+    key = hashlib.sha1(os.path.normcase(os.path.abspath(source_dir)).encode("utf-8")).hexdigest()
+    return os.path.join(cache_root, "rom_scripts", "list_manager", key + ".json")
+
+
+def load_snapshot(source_dir):
+    try:
+        with open(snapshot_path(source_dir), 'r', encoding="utf-8") as f:
+            snapshot = json.load(f)
+        if snapshot.get("source_dir") == source_dir:
+            return snapshot
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def save_snapshot(source_dir, mtime, files, sizes):
+    path = snapshot_path(source_dir)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding="utf-8") as f:
+            json.dump({"source_dir": source_dir, "mtime": mtime, "files": files, "sizes": sizes}, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def scan_directory(source_dir):
+    """List the regular files in `source_dir` using scandir's cached entry types.
+
+    Returns the file names and whatever sizes came for free: on Windows the
+    directory listing already carries them, elsewhere they need a stat and
+    are left to SizeWorker.
+    """
+    files = []
+    sizes = {}
+    with os.scandir(source_dir) as entries:
+        for entry in entries:
+            if entry.is_file():
+                files.append(entry.name)
+                if os.name == "nt":
+                    sizes[entry.name] = entry.stat().st_size
+    return files, sizes
+
+
+def scan_media_sizes(source_dir):
+    """Total bytes of ES-DE media per ROM stem for the system of `source_dir`."""
+    media_dir = os.path.join(MEDIA_ROOT, os.path.basename(source_dir))
+    totals = defaultdict(int)
+    try:
+        with os.scandir(media_dir) as folders:
+            for folder in folders:
+                if not folder.is_dir():
+                    continue
+                with os.scandir(folder.path) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            totals[os.path.splitext(entry.name)[0]] += entry.stat().st_size
+    except OSError:
+        pass
+    return dict(totals)
+
+
+def format_size(num_bytes):
+    if num_bytes >= BYTES_PER_GB:
+        return f"{num_bytes / BYTES_PER_GB:.2f} GB"
+    return f"{num_bytes / 1000 ** 2:.1f} MB"
+
+
+class SearchIndex:
+    """Substring search over a fixed, sorted array of names.
+
+    Casefolded names are computed once, and a trigram index maps every
+    three-character sequence to the (sorted) indices of names containing it,
+    so a search only verifies the candidates of its rarest trigram. A search
+    that extends the previous term narrows the previous result instead.
+    """
+
+    def __init__(self, names):
+        self.folded = [name.casefold() for name in names]
+        self.trigrams = defaultdict(list)
+        for i, name in enumerate(self.folded):
+            for gram in set(map(''.join, zip(name, name[1:], name[2:]))):
+                self.trigrams[gram].append(i)
+        self.last_term = None
+        self.last_result = None
+
+    def search(self, term):
+        """Return the sorted indices of all names containing `term`."""
+        term = term.casefold()
+        if self.last_term is not None and self.last_term in term:
+            candidates = self.last_result
+        elif len(term) >= 3:
+            postings = [self.trigrams.get(term[j:j + 3], []) for j in range(len(term) - 2)]
+            candidates = min(postings, key=len)
+        else:
+            candidates = range(len(self.folded))
+        folded = self.folded
+        result = [i for i in candidates if term in folded[i]]
+        self.last_term = term
+        self.last_result = result
+        return result
+
+
+class PixmapCache:
+    """Bounded least-recently-used cache of scaled preview pixmaps."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.items = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def get(self, key):
+        self.items.move_to_end(key)
+        return self.items[key]
+
+    def put(self, key, pixmap):
+        self.items[key] = pixmap
+        self.items.move_to_end(key)
+        while len(self.items) > self.capacity:
+            self.items.popitem(last=False)
+
+
+class MediaPreviewIndex:
+    """Maps ROM names to preview images, listing each media folder only once."""
+
+    def __init__(self):
+        self.indexes = {}
+        self.lock = threading.Lock()
+
+    def lookup(self, source_dir, name):
+        with self.lock:
+            index = self.indexes.get(source_dir)
+            if index is None:
+                index = self.build(source_dir)
+                self.indexes[source_dir] = index
+        return index.get(os.path.splitext(name)[0])
+
+    def build(self, source_dir):
+        index = {}
+        system_dir = os.path.join(MEDIA_ROOT, os.path.basename(source_dir))
+        # Walk the least preferred folder first so better matches overwrite it.
+        for folder in reversed(PREVIEW_FOLDERS):
+            try:
+                with os.scandir(os.path.join(system_dir, folder)) as entries:
+                    for entry in entries:
+                        stem, ext = os.path.splitext(entry.name)
+                        if ext.lower() in IMAGE_EXTENSIONS:
+                            index[stem] = entry.path
+            except OSError:
+                continue
+        return index
+
+
+class ListDocument:
+    """A .list file: the source directory from its first line plus its entries.
+
+    Every add/remove is journaled as (added, names) on an undo stack. The
+    document is modified whenever the stack depth differs from the depth at
+    the last save, so no file has to be reread to detect unsaved changes.
+    """
+
+    def __init__(self, path, orig_source_dir, entries):
+        self.path = path
+        self.orig_source_dir = orig_source_dir
+        self.entries = entries
+        self.saved_source_dir = orig_source_dir
+        self.undo_stack = []
+        self.redo_stack = []
+        self.saved_depth = 0
+
+    @property
+    def modified(self):
+        return len(self.undo_stack) != self.saved_depth or self.orig_source_dir != self.saved_source_dir
+
+    def record(self, added, names):
+        if len(self.undo_stack) < self.saved_depth:
+            # The saved state was on the discarded redo branch.
+            self.saved_depth = -1
+        self.undo_stack.append((added, names))
+        self.redo_stack.clear()
+
+    def mark_saved(self):
+        self.saved_depth = len(self.undo_stack)
+        self.saved_source_dir = self.orig_source_dir
+
+    def write(self):
+        """Write the list through a temporary file so a failed save never truncates it."""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', newline='\n') as f:
+            f.write(self.orig_source_dir + '\n')
+            for entry in sorted(self.entries, key=str.lower):
+                f.write(entry + '\n')
+        os.replace(tmp_path, self.path)
+        self.mark_saved()
+
+    @property
+    def label(self):
+        return os.path.splitext(os.path.basename(self.path))[0]
+
+    @classmethod
+    def read(cls, path):
+        with open(path, 'r') as f:
+            lines = f.readlines()
+        if not lines:
+            raise ValueError("List file is empty.")
+        return cls(path, lines[0].strip(), set(line.strip() for line in lines[1:] if line.strip()))
 
 
 class SignalProxy(QObject):
-    finished = pyqtSignal(list)
+    # generation, source dir, names, search index, files on disk, refreshing;
+    # names is None if a rescan found no changes.
+    finished = pyqtSignal(int, str, object, object, object, bool)
+
+
+class MoveSignalProxy(QObject):
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(list, list)
+
+
+class MoveWorker(QRunnable):
+    """Computes both panes' member arrays for a very large move."""
+
+    def __init__(self, source_members, target_members, moved, signal_proxy):
+        super().__init__()
+        self.source_members = source_members
+        self.target_members = target_members
+        self.moved = moved
+        self.signal_proxy = signal_proxy
+
+    def run(self):
+        moved = set(self.moved)
+        total = len(self.source_members)
+        source = []
+        for start in range(0, total, MOVE_PROGRESS_STEP):
+            chunk = self.source_members[start:start + MOVE_PROGRESS_STEP]
+            source.extend(i for i in chunk if i not in moved)
+            self.signal_proxy.progress.emit(min(99, (start + len(chunk)) * 100 // max(total, 1)))
+        target = list(merge(self.target_members, self.moved))
+        self.signal_proxy.progress.emit(100)
+        self.signal_proxy.finished.emit(source, target)
+
+
+class PreviewSignalProxy(QObject):
+    # key, scaled QImage (None if there is no image), loaded; loaded is False
+    # when the request went stale before it was decoded.
+    finished = pyqtSignal(object, object, bool)
+
+
+class PreviewWorker(QRunnable):
+    """Decodes and scales one preview image off the UI thread."""
+
+    def __init__(self, key, media_index, is_wanted, signal_proxy):
+        super().__init__()
+        self.key = key
+        self.media_index = media_index
+        self.is_wanted = is_wanted
+        self.signal_proxy = signal_proxy
+
+    def run(self):
+        if not self.is_wanted(self.key):
+            # The selection moved on while this request was queued.
+            self.signal_proxy.finished.emit(self.key, None, False)
+            return
+        source_dir, name = self.key
+        image = None
+        path = self.media_index.lookup(source_dir, name)
+        if path:
+            decoded = QImage(path)
+            if not decoded.isNull():
+                image = decoded.scaled(PREVIEW_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        self.signal_proxy.finished.emit(self.key, image, True)
+
+
+class SizeSignalProxy(QObject):
+    # generation, source dir, ROM sizes, media sizes (None if not requested),
+    # done; a first emission covers the current list's entries only.
+    finished = pyqtSignal(int, str, object, object, bool)
+
+
+class SizeWorker(QRunnable):
+    """Collects ROM (and optionally ES-DE media) sizes for a source directory.
+
+    Sizes already in the directory snapshot are reused; the rest are stat'ed,
+    the current list's entries first, and written back to the snapshot.
+    """
+
+    def __init__(self, source_dir, priority, include_media, signal_proxy, generation):
+        super().__init__()
+        self.source_dir = source_dir
+        self.priority = priority
+        self.include_media = include_media
+        self.signal_proxy = signal_proxy
+        self.generation = generation
+
+    def run(self):
+        snapshot = load_snapshot(self.source_dir)
+        files = snapshot["files"] if snapshot is not None else []
+        sizes = dict(snapshot.get("sizes", {})) if snapshot is not None else {}
+        media = scan_media_sizes(self.source_dir) if self.include_media else None
+        missing = [name for name in self.priority if name not in sizes]
+        self.stat_names(missing, sizes)
+        self.signal_proxy.finished.emit(self.generation, self.source_dir, dict(sizes), media, False)
+        missing = [name for name in files if name not in sizes]
+        self.stat_names(missing, sizes)
+        if snapshot is not None and missing:
+            save_snapshot(self.source_dir, snapshot["mtime"], files, sizes)
+        self.signal_proxy.finished.emit(self.generation, self.source_dir, sizes, media, True)
+
+    def stat_names(self, names, sizes):
+        for name in names:
+            try:
+                sizes[name] = os.stat(os.path.join(self.source_dir, name)).st_size
+            except OSError:
+                pass
 
 
 class ListLoaderWorker(QRunnable):
-    def __init__(self, source_dir, current_entries, signal_proxy):
+    def __init__(self, source_dir, current_entries, signal_proxy, generation=0):
         super().__init__()
         self.source_dir = source_dir
         self.current_entries = current_entries
         self.signal_proxy = signal_proxy
+        self.generation = generation
 
     def run(self):
+        """Show the cached snapshot at once, then rescan if the directory changed."""
+        snapshot = load_snapshot(self.source_dir)
+        try:
+            mtime = os.stat(self.source_dir).st_mtime
+        except OSError:
+            mtime = None
+        if snapshot is not None:
+            up_to_date = mtime is not None and snapshot["mtime"] == mtime
+            self.emit_names(snapshot["files"], not up_to_date)
+            if up_to_date:
+                return
         try:
-            all_files = sorted([
-                f for f in os.listdir(self.source_dir)
-                if os.path.isfile(os.path.join(self.source_dir, f))
-            ], key=str.lower)
-            available = sorted(set(all_files) - self.current_entries, key=str.lower)
+            all_files, sizes = scan_directory(self.source_dir)
+            if snapshot is not None:
+                # Keep cached sizes of files that are still there.
+                cached_sizes = snapshot.get("sizes", {})
+                sizes = {**{f: cached_sizes[f] for f in all_files if f in cached_sizes}, **sizes}
+            save_snapshot(self.source_dir, mtime, all_files, sizes)
         except Exception:
-            available = []
-        self.signal_proxy.finished.emit(available)
+            all_files = None if snapshot is not None else []
+        if all_files is None or (snapshot is not None and set(snapshot["files"]) == set(all_files)):
+            self.signal_proxy.finished.emit(self.generation, self.source_dir, None, None, None, False)
+        else:
+            self.emit_names(all_files, False)
+
+    def emit_names(self, files, refreshing):
+        # Entries of every list on this directory share the array; only files on disk are offered as available.
+        on_disk = frozenset(files)
+        names = sorted(on_disk | self.current_entries, key=str.lower)
+        self.signal_proxy.finished.emit(
+            self.generation, self.source_dir, names, SearchIndex(names), on_disk, refreshing)
+
+
+class RomListModel(QAbstractListModel):
+    """List model over a shared array of names sorted case-insensitively.
+
+    The model only holds indices into the shared array: `members` are the
+    entries belonging to this pane and `visible` the subset passing the
+    current search filter. Index order follows name order, so both stay
+    sorted and single entries can be moved with bisect instead of rebuilding.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.names = []
+        self.members = []
+        self.visible = []
+        self.matches = None
+        # Optional callable returning a badge string for a name.
+        self.badges = None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.visible)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            name = self.names[self.visible[index.row()]]
+            badge = self.badges(name) if self.badges else ""
+            return f"{name}    [in {badge}]" if badge else name
+        return None
+
+    def reset(self, names, members):
+        self.beginResetModel()
+        self.names = names
+        self.members = members
+        self.visible = self._filtered(members)
+        self.endResetModel()
+
+    def replace_members(self, members):
+        self.reset(self.names, members)
+
+    def set_filter(self, matches):
+        """Only show members whose index is in `matches` (None shows all)."""
+        self.matches = None if matches is None else set(matches)
+        self.beginResetModel()
+        self.visible = self._filtered(self.members)
+        self.endResetModel()
+
+    def _filtered(self, members):
+        if self.matches is None:
+            return list(members)
+        return [i for i in members if i in self.matches]
+
+    def indices_for_rows(self, rows):
+        return [self.visible[row] for row in rows]
+
+    def insert_index(self, idx):
+        insort(self.members, idx)
+        if self.matches is not None and idx not in self.matches:
+            return
+        row = bisect_left(self.visible, idx)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.visible.insert(row, idx)
+        self.endInsertRows()
+
+    def remove_index(self, idx):
+        pos = bisect_left(self.members, idx)
+        if pos < len(self.members) and self.members[pos] == idx:
+            del self.members[pos]
+        row = bisect_left(self.visible, idx)
+        if row < len(self.visible) and self.visible[row] == idx:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.visible[row]
+            self.endRemoveRows()
+
+    def insert_indices(self, indices):
+        """Insert a sorted batch of indices that are not members yet."""
+        if len(indices) <= INCREMENTAL_MOVE_LIMIT:
+            for idx in indices:
+                self.insert_index(idx)
+        else:
+            self.replace_members(list(merge(self.members, indices)))
+
+    def remove_indices(self, indices):
+        """Remove a sorted batch of member indices."""
+        if len(indices) <= INCREMENTAL_MOVE_LIMIT:
+            for idx in indices:
+                self.remove_index(idx)
+        else:
+            removed = set(indices)
+            self.replace_members([i for i in self.members if i not in removed])
 
 
 class ListManager(QWidget):
     def closeEvent(self, event):
         if hasattr(self, 'list_file') and self.list_file:
-            current_list = sorted(self.current_entries, key=str.lower)
-            try:
-                with open(self.list_file, 'r') as f:
-                    lines = f.readlines()[1:]
-                    original_list = sorted([line.strip() for line in lines if line.strip()], key=str.lower)
-            except Exception:
-                original_list = []
-
-            if current_list != original_list or self.source_dir_edit.text().strip() != self.orig_source_dir:
+            modified = [doc for doc in self.documents.values() if doc.modified]
+            if modified:
                 reply = QMessageBox.question(
                     self,
                     "Unsaved Changes",
@@ -55,21 +512,35 @@ class ListManager(QWidget):
                     event.ignore()
                     return
                 elif reply == QMessageBox.Yes:
-                    self.save_list_file()
+                    self.save_documents(modified)
                     event.accept()
                     return
         event.accept()
 
     def __init__(self):
         super().__init__()
-        self.setWindowTitle(".list File Manager")
+        self.setWindowTitle(".list File Manager[*]")
         self.resize(1280, 720)
 
         self.list_file = None
         self.source_dir = None
         self.current_entries = set()
-        self.all_available = []
-        self.all_in_list = []
+        self.all_names = []
+        self.name_index = {}
+        self.search_index = SearchIndex([])
+        # Workspace state: every open .list file, the shared name array and
+        # search index per source directory, and which lists hold each name.
+        self.documents = {}
+        self.dir_names = {}
+        self.membership = defaultdict(set)
+        self.load_generation = 0
+        # Size bookkeeping for the current list, fed by SizeWorker.
+        self.dir_sizes = {}
+        self.dir_media = {}
+        self.size_requests = set()
+        self.sizes_pending = set()
+        self.list_bytes = 0
+        self.list_media_bytes = 0
 
         menu_bar = QMenuBar(self)
         file_menu = menu_bar.addMenu("File")
@@ -80,6 +551,29 @@ class ListManager(QWidget):
         new_action = file_menu.addAction("New List File")
         new_action.triggered.connect(self.create_new_list_file)
 
+        workspace_action = file_menu.addAction("Open Workspace Folder")
+        workspace_action.triggered.connect(self.open_workspace)
+
+        edit_menu = menu_bar.addMenu("Edit")
+
+        undo_action = edit_menu.addAction("Undo")
+        undo_action.setShortcut(QKeySequence.Undo)
+        undo_action.triggered.connect(self.undo)
+
+        redo_action = edit_menu.addAction("Redo")
+        redo_action.setShortcut(QKeySequence.Redo)
+        redo_action.triggered.connect(self.redo)
+
+        self.list_selector = QComboBox()
+        self.list_selector.currentIndexChanged.connect(self.select_document)
+
+        self.workspace_row = QWidget()
+        workspace_layout = QHBoxLayout(self.workspace_row)
+        workspace_layout.setContentsMargins(0, 0, 0, 0)
+        workspace_layout.addWidget(QLabel("List:"))
+        workspace_layout.addWidget(self.list_selector, 1)
+        self.workspace_row.hide()
+
         self.save_button = QPushButton("Save Changes")
         self.save_button.clicked.connect(self.save_list_file)
 
@@ -99,9 +593,31 @@ class ListManager(QWidget):
         self.status = QLabel("No file loaded")
         self.counts = QLabel("0 available, 0 in list")
 
+        self.size_label = QLabel("Size: -")
+        self.include_media = QCheckBox("Include media")
+        self.include_media.toggled.connect(self.request_sizes)
+        self.capacity_spin = QDoubleSpinBox()
+        self.capacity_spin.setRange(0, 100000)
+        self.capacity_spin.setDecimals(1)
+        self.capacity_spin.setSuffix(" GB")
+        self.capacity_spin.setSpecialValueText("No target")
+        self.capacity_spin.valueChanged.connect(self.update_size_label)
+
+        size_layout = QHBoxLayout()
+        size_layout.addWidget(self.size_label, 1)
+        size_layout.addWidget(self.include_media)
+        size_layout.addWidget(QLabel("Target:"))
+        size_layout.addWidget(self.capacity_spin)
+
         self.search_bar = QLineEdit()
-        self.search_bar.setPlaceholderText("Type 4+ characters to search...")
-        self.search_bar.textChanged.connect(self.filter_lists)
+        self.search_bar.setPlaceholderText(f"Type {MIN_SEARCH_LENGTH}+ characters to search...")
+        self.search_bar.textChanged.connect(self.schedule_filter)
+
+        # Debounce typing so a burst of keystrokes triggers a single search.
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.filter_lists)
 
         self.clear_button = QPushButton("Clear")
         self.clear_button.clicked.connect(self.clear_filter)
@@ -111,11 +627,13 @@ class ListManager(QWidget):
         search_layout.addWidget(self.search_bar)
         search_layout.addWidget(self.clear_button)
 
-        self.available_list = QListWidget()
-        self.available_list.setSelectionMode(QListWidget.MultiSelection)
+        self.available_model = RomListModel(self)
+        self.available_model.badges = self.badge_for
+        self.available_list = self.create_list_view(self.available_model)
 
-        self.in_list = QListWidget()
-        self.in_list.setSelectionMode(QListWidget.MultiSelection)
+        self.in_list_model = RomListModel(self)
+        self.in_list_model.badges = self.badge_for
+        self.in_list = self.create_list_view(self.in_list_model)
 
         self.add_button = QPushButton("Add >>")
         self.add_button.clicked.connect(self.add_selected)
@@ -129,27 +647,117 @@ class ListManager(QWidget):
         button_layout.addWidget(self.remove_button)
         button_layout.addStretch()
 
+        self.preview_label = QLabel("No preview")
+        self.preview_label.setAlignment(Qt.AlignCenter)
+        self.preview_label.setFixedSize(PREVIEW_SIZE)
+
+        preview_layout = QVBoxLayout()
+        preview_layout.addWidget(self.preview_label)
+        preview_layout.addStretch()
+
         lists_layout = QHBoxLayout()
         lists_layout.addWidget(self.available_list)
         lists_layout.addLayout(button_layout)
         lists_layout.addWidget(self.in_list)
+        lists_layout.addLayout(preview_layout)
 
         top_layout = QVBoxLayout()
         top_layout.setMenuBar(menu_bar)
         top_layout.addWidget(self.save_button)
+        top_layout.addWidget(self.workspace_row)
         top_layout.addWidget(QLabel("Source Directory:"))
         top_layout.addLayout(source_layout)
         top_layout.addLayout(search_layout)
         top_layout.addWidget(self.status)
         top_layout.addWidget(self.counts)
+        top_layout.addLayout(size_layout)
         top_layout.addLayout(lists_layout)
 
         self.setLayout(top_layout)
         self.threadpool = QThreadPool()
+        self.signal_proxy = SignalProxy(self)
+        self.signal_proxy.finished.connect(self.finish_list_update)
+        self.size_proxy = SizeSignalProxy(self)
+        self.size_proxy.finished.connect(self.finish_size_update)
+
+        # Previews decode on their own small pool so they never hold up loads.
+        self.preview_pool = QThreadPool(self)
+        self.preview_pool.setMaxThreadCount(2)
+        self.preview_proxy = PreviewSignalProxy(self)
+        self.preview_proxy.finished.connect(self.finish_preview)
+        self.preview_index = MediaPreviewIndex()
+        self.preview_cache = PixmapCache(PREVIEW_CACHE_SIZE)
+        self.preview_key = None
+        self.preview_wanted = frozenset()
+        self.preview_pending = set()
+        for view in (self.available_list, self.in_list):
+            view.selectionModel().currentChanged.connect(
+                lambda current, previous, view=view: self.preview_current(view, current))
+
+    def create_list_view(self, model):
+        view = QListView()
+        view.setModel(model)
+        view.setSelectionMode(QAbstractItemView.MultiSelection)
+        # Lets the view lay out only the rows that are actually on screen.
+        view.setUniformItemSizes(True)
+        return view
+
+    def preview_current(self, view, index):
+        """Show the preview for the current row and prefetch its neighbours."""
+        model = view.model()
+        row = index.row()
+        if row < 0 or not self.source_dir:
+            return
+        rows = [row] + [r for offset in range(1, PREVIEW_PREFETCH + 1)
+                        for r in (row + offset, row - offset) if 0 <= r < model.rowCount()]
+        keys = [(self.source_dir, model.names[model.visible[r]]) for r in rows]
+        self.preview_key = keys[0]
+        # Swapped whole, never mutated: queued workers read it from their own threads.
+        self.preview_wanted = frozenset(keys)
+        if self.preview_key in self.preview_cache:
+            self.show_preview(self.preview_cache.get(self.preview_key))
+        else:
+            self.preview_label.setText("Loading preview...")
+        for key in keys:
+            if key not in self.preview_cache and key not in self.preview_pending:
+                self.start_preview(key)
+
+    def start_preview(self, key):
+        self.preview_pending.add(key)
+        self.preview_pool.start(PreviewWorker(
+            key, self.preview_index, lambda key: key in self.preview_wanted, self.preview_proxy))
+
+    def finish_preview(self, key, image, loaded):
+        self.preview_pending.discard(key)
+        if not loaded:
+            # Skipped as stale, but the selection may have come back to it meanwhile.
+            if key in self.preview_wanted and key not in self.preview_cache:
+                self.start_preview(key)
+            return
+        pixmap = QPixmap.fromImage(image) if image is not None else None
+        self.preview_cache.put(key, pixmap)
+        if key == self.preview_key:
+            self.show_preview(pixmap)
+
+    def show_preview(self, pixmap):
+        if pixmap is None:
+            self.preview_label.setPixmap(QPixmap())
+            self.preview_label.setText("No preview")
+        else:
+            self.preview_label.setPixmap(pixmap)
 
     def update_source_dir(self, text):
         self.orig_source_dir = text.strip()
-        self.source_dir = os.path.normpath(self.orig_source_dir.replace("/mnt/user/Stuff/", "Y:/"))
+        self.source_dir = local_source_dir(self.orig_source_dir)
+        if self.list_file in self.documents:
+            doc = self.documents[self.list_file]
+            old_dir = local_source_dir(doc.orig_source_dir)
+            if old_dir != self.source_dir:
+                for entry in doc.entries:
+                    self.membership[old_dir, entry].discard(doc.label)
+                    self.membership[self.source_dir, entry].add(doc.label)
+            doc.orig_source_dir = self.orig_source_dir
+            self.update_modified()
 
     def change_source_directory(self):
         start_dir = ""
@@ -172,19 +780,7 @@ class ListManager(QWidget):
             with open(save_path, 'w', newline='\n') as f:
                 f.write(linux_style_path + '\n')
             QMessageBox.information(self, "Created", f"New .list file created:\n{save_path}")
-            self.list_file = save_path
-            self.orig_source_dir = linux_style_path
-            self.source_dir = folder
-            self.source_dir_edit.setText(linux_style_path)
-            self.current_entries = set()
-            self.all_available = []
-            self.all_in_list = []
-            self.status.setText("Loading")
-            self.loading_dots = 0
-            self.loading_timer = QTimer(self)
-            self.loading_timer.timeout.connect(self.animate_loading)
-            self.loading_timer.start(300)
-            QTimer.singleShot(50, self.start_background_worker)
+            self.set_documents([ListDocument(save_path, linux_style_path, set())])
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to create file:\n{e}")
 
@@ -192,113 +788,375 @@ class ListManager(QWidget):
         path, _ = QFileDialog.getOpenFileName(self, "Select .list File", "", "List Files (*.list)")
         if not path:
             return
-        self.list_file = path
         try:
-            with open(path, 'r') as f:
-                lines = f.readlines()
+            doc = ListDocument.read(path)
+        except ValueError as e:
+            QMessageBox.critical(self, "Error", str(e))
+            return
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to read list file:\n{e}")
             return
-        if not lines:
-            QMessageBox.critical(self, "Error", "List file is empty.")
+        self.set_documents([doc])
+
+    def open_workspace(self):
+        folder = QFileDialog.getExistingDirectory(self, "Select Folder With .list Files")
+        if not folder:
+            return
+        docs = []
+        failed = []
+        for name in sorted(os.listdir(folder), key=str.lower):
+            if not name.lower().endswith(".list"):
+                continue
+            try:
+                docs.append(ListDocument.read(os.path.join(folder, name)))
+            except Exception:
+                failed.append(name)
+        if failed:
+            QMessageBox.warning(self, "Warning", "Could not read:\n" + "\n".join(failed))
+        if not docs:
+            QMessageBox.critical(self, "Error", f"No .list files found in:\n{folder}")
             return
-        self.orig_source_dir = lines[0].strip()
-        self.source_dir_edit.setText(self.orig_source_dir)
-        self.source_dir = os.path.normpath(self.orig_source_dir.replace("/mnt/user/Stuff/", "Y:/"))
+        self.set_documents(docs)
+
+    def set_documents(self, docs):
+        """Replace the open lists, show the first one and load every source directory."""
+        self.load_generation += 1
+        self.documents = {doc.path: doc for doc in docs}
+        self.dir_names = {}
+        self.dir_sizes = {}
+        self.dir_media = {}
+        self.size_requests = set()
+        self.membership = defaultdict(set)
+        for doc in docs:
+            source_dir = local_source_dir(doc.orig_source_dir)
+            for entry in doc.entries:
+                self.membership[source_dir, entry].add(doc.label)
+        self.list_selector.blockSignals(True)
+        self.list_selector.clear()
+        for doc in docs:
+            self.list_selector.addItem(doc.label, doc.path)
+        self.list_selector.blockSignals(False)
+        self.workspace_row.setVisible(len(docs) > 1)
+        self.show_document(docs[0].path)
+        # Lists sharing a source directory share one load.
+        for source_dir in {local_source_dir(doc.orig_source_dir) for doc in docs}:
+            if source_dir != self.source_dir and os.path.isdir(source_dir):
+                self.start_background_worker(source_dir)
+
+    def select_document(self, row):
+        path = self.list_selector.itemData(row)
+        if path and path != self.list_file:
+            self.show_document(path)
+
+    def show_document(self, path):
+        doc = self.documents[path]
+        self.list_file = doc.path
+        self.current_entries = doc.entries
+        self.update_modified()
+        self.source_dir_edit.setText(doc.orig_source_dir)
         if not os.path.isdir(self.source_dir):
+            self.set_names([], SearchIndex([]), frozenset())
+            self.update_counts()
             QMessageBox.critical(self, "Error", f"Source directory does not exist:\n{self.source_dir}")
             return
+        cached = self.dir_names.get(self.source_dir)
+        if cached is not None:
+            self.set_names(*cached)
+            self.filter_lists()
+            self.status.setText(f"Loaded: {os.path.basename(self.list_file)}")
+            self.recompute_size()
+            self.request_sizes()
+            return
         self.loading_dots = 0
         self.loading_timer = QTimer(self)
         self.loading_timer.timeout.connect(self.animate_loading)
         self.loading_timer.start(300)
         self.status.setText("Loading")
         QApplication.processEvents()
-        self.current_entries = set(line.strip() for line in lines[1:] if line.strip())
-        QTimer.singleShot(50, self.start_background_worker)
+        QTimer.singleShot(50, lambda: self.start_background_worker(self.source_dir))
 
-    def start_background_worker(self):
-        self.signal_proxy = SignalProxy(self)
-        self.signal_proxy.finished.connect(self.finish_list_update)
-        worker = ListLoaderWorker(self.source_dir, self.current_entries, self.signal_proxy)
+    def entries_for_dir(self, source_dir):
+        """All entries of the open lists that draw from `source_dir`."""
+        entries = set()
+        for doc in self.documents.values():
+            if local_source_dir(doc.orig_source_dir) == source_dir:
+                entries |= doc.entries
+        return entries
+
+    def start_background_worker(self, source_dir):
+        worker = ListLoaderWorker(
+            source_dir, self.entries_for_dir(source_dir), self.signal_proxy, self.load_generation)
         self.threadpool.start(worker)
-        self.worker = worker
 
-    def finish_list_update(self, available):
+    def finish_list_update(self, generation, source_dir, names, search_index, on_disk, refreshing):
+        if generation != self.load_generation:
+            # Late result from lists that are no longer open.
+            return
+        if names is not None:
+            self.dir_names[source_dir] = (names, search_index, on_disk)
+        if source_dir != self.source_dir:
+            return
         if hasattr(self, 'loading_timer') and self.loading_timer.isActive():
             self.loading_timer.stop()
-        self.all_available = available
-        self.all_in_list = sorted(self.current_entries, key=str.lower)
-        self.filter_lists()
-        self.status.setText(f"Loaded: {os.path.basename(self.list_file)}")
+        if names is not None:
+            self.set_names(names, search_index, on_disk)
+            self.filter_lists()
+        if refreshing:
+            self.status.setText(f"Loaded: {os.path.basename(self.list_file)} (cached, refreshing...)")
+        else:
+            self.status.setText(f"Loaded: {os.path.basename(self.list_file)}")
+            self.request_sizes()
+
+    def request_sizes(self):
+        """Start a SizeWorker for the current source directory if needed."""
+        if not self.source_dir or self.source_dir not in self.dir_names:
+            return
+        with_media = self.include_media.isChecked() and self.source_dir not in self.dir_media
+        if self.source_dir in self.dir_sizes and not with_media:
+            self.recompute_size()
+            return
+        key = (self.source_dir, with_media)
+        if key in self.size_requests:
+            return
+        self.size_requests.add(key)
+        self.size_label.setText("Size: calculating...")
+        self.threadpool.start(SizeWorker(
+            self.source_dir, list(self.current_entries), with_media, self.size_proxy, self.load_generation))
+
+    def finish_size_update(self, generation, source_dir, sizes, media, done):
+        if generation != self.load_generation:
+            return
+        self.dir_sizes[source_dir] = sizes
+        if done:
+            self.sizes_pending.discard(source_dir)
+        else:
+            self.sizes_pending.add(source_dir)
+        if media is not None:
+            self.dir_media[source_dir] = media
+        if source_dir == self.source_dir:
+            self.recompute_size()
+
+    def entry_media_bytes(self, names):
+        media = self.dir_media.get(self.source_dir)
+        if not self.include_media.isChecked() or media is None:
+            return 0
+        return sum(media.get(os.path.splitext(name)[0], 0) for name in names)
+
+    def recompute_size(self):
+        sizes = self.dir_sizes.get(self.source_dir)
+        if sizes is None:
+            self.size_label.setText("Size: -")
+            return
+        self.list_bytes = sum(sizes.get(name, 0) for name in self.current_entries)
+        self.list_media_bytes = self.entry_media_bytes(self.current_entries)
+        self.update_size_label()
+
+    def adjust_size(self, names, sign):
+        """Incrementally account for entries added to (+1) or removed from (-1) the list."""
+        sizes = self.dir_sizes.get(self.source_dir)
+        if sizes is None:
+            return
+        self.list_bytes += sign * sum(sizes.get(name, 0) for name in names)
+        self.list_media_bytes += sign * self.entry_media_bytes(names)
+        self.update_size_label()
+
+    def total_bytes(self):
+        return self.list_bytes + self.list_media_bytes
+
+    def over_capacity(self):
+        target = self.capacity_spin.value() * BYTES_PER_GB
+        return target > 0 and self.total_bytes() > target
+
+    def update_size_label(self):
+        if self.source_dir not in self.dir_sizes:
+            return
+        text = f"Size: {format_size(self.list_bytes)} ROMs"
+        if self.include_media.isChecked() and self.source_dir in self.dir_media:
+            text += f" + {format_size(self.list_media_bytes)} media = {format_size(self.total_bytes())}"
+        if self.capacity_spin.value() > 0:
+            text += f" / {self.capacity_spin.value():g} GB target"
+        if self.source_dir in self.sizes_pending:
+            text += " (calculating...)"
+        if self.over_capacity():
+            text = "⚠️ " + text + " (over target)"
+            self.size_label.setStyleSheet("color: red;")
+        else:
+            self.size_label.setStyleSheet("")
+        self.size_label.setText(text)
 
     def save_list_file(self):
         if not self.list_file:
             return
+        if not self.documents[self.list_file].modified:
+            self.status.setText(f"No changes to save in {os.path.basename(self.list_file)}")
+            return
+        if self.over_capacity():
+            reply = QMessageBox.question(
+                self,
+                "Over Capacity",
+                f"This list needs {format_size(self.total_bytes())}, more than the "
+                f"{self.capacity_spin.value():g} GB target. Save anyway?",
+                QMessageBox.Yes | QMessageBox.No,
+                QMessageBox.No
+            )
+            if reply != QMessageBox.Yes:
+                return
+        self.save_documents([self.documents[self.list_file]])
+
+    def save_documents(self, docs):
         try:
-            with open(self.list_file, 'w', newline='\n') as f:
-                f.write(self.orig_source_dir + '\n')
-                for entry in sorted(self.current_entries, key=str.lower):
-                    f.write(entry + '\n')
+            for doc in docs:
+                doc.write()
             QMessageBox.information(self, "Saved", "List file saved successfully.")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to save list file:\n{e}")
+        self.update_modified()
+
+    def update_modified(self):
+        doc = self.documents.get(self.list_file)
+        self.setWindowModified(doc is not None and doc.modified)
+
+    def undo(self):
+        doc = self.documents.get(self.list_file)
+        if doc is None or not doc.undo_stack or not self.add_button.isEnabled():
+            return
+        added, names = doc.undo_stack.pop()
+        doc.redo_stack.append((added, names))
+        self.apply_change(not added, names)
+
+    def redo(self):
+        doc = self.documents.get(self.list_file)
+        if doc is None or not doc.redo_stack or not self.add_button.isEnabled():
+            return
+        added, names = doc.redo_stack.pop()
+        doc.undo_stack.append((added, names))
+        self.apply_change(added, names)
+
+    def apply_change(self, add, names):
+        """Replay a journaled change on the panes without journaling it again."""
+        indices = sorted(self.name_index[name] for name in names if name in self.name_index)
+        if add:
+            self.move_entries(indices, self.available_model, self.in_list_model, record=False)
+        else:
+            self.move_entries(indices, self.in_list_model, self.available_model, record=False)
+
+    def badge_for(self, name):
+        """Names of the other open lists that already contain `name`."""
+        # Keyed by directory: arcade, fbneo and mame lists share zip names for different games.
+        lists = self.membership.get((self.source_dir, name))
+        if not lists or len(self.documents) < 2:
+            return ""
+        current = self.documents[self.list_file].label
+        return ", ".join(sorted(label for label in lists if label != current))
+
+    def set_names(self, names, search_index, on_disk):
+        """Install a new shared name array and its search index in both panes.
+
+        Names that are neither on disk nor in the current list belong to other
+        lists on the same directory and stay out of both panes.
+        """
+        self.all_names = names
+        self.name_index = {name: i for i, name in enumerate(names)}
+        self.search_index = search_index
+        available_members = []
+        in_list_members = []
+        for i, name in enumerate(self.all_names):
+            if name in self.current_entries:
+                in_list_members.append(i)
+            elif name in on_disk:
+                available_members.append(i)
+        self.available_model.reset(self.all_names, available_members)
+        self.in_list_model.reset(self.all_names, in_list_members)
+
+    def schedule_filter(self):
+        self.search_timer.start()
 
     def filter_lists(self):
-        term = self.search_bar.text().lower()
-        self.available_list.clear()
-        self.in_list.clear()
-        if len(term) >= 4:
-            filtered_available = [f for f in self.all_available if term in f.lower()]
-            filtered_in_list = [f for f in self.all_in_list if term in f.lower()]
+        self.search_timer.stop()
+        term = self.search_bar.text()
+        if len(term) >= MIN_SEARCH_LENGTH:
+            matches = self.search_index.search(term)
         else:
-            filtered_available = self.all_available
-            filtered_in_list = self.all_in_list
-        self.available_list.addItems(filtered_available)
-        self.in_list.addItems(filtered_in_list)
+            matches = None
+        self.available_model.set_filter(matches)
+        self.in_list_model.set_filter(matches)
         self.update_counts()
 
     def clear_filter(self):
         self.search_bar.clear()
         self.filter_lists()
 
+    def selected_indices(self, view, model):
+        rows = sorted(index.row() for index in view.selectionModel().selectedRows())
+        view.clearSelection()
+        return model.indices_for_rows(rows)
+
     def add_selected(self):
-        selected_items = self.available_list.selectedItems()
-        if not selected_items:
-            return
-        added = []
-        for item in selected_items:
-            text = item.text()
-            if text not in self.current_entries:
-                self.current_entries.add(text)
-                added.append(text)
-        if added:
-            self.all_available = [f for f in self.all_available if f not in added]
-            self.all_in_list = sorted(self.current_entries, key=str.lower)
-            self.filter_lists()
+        selected = self.selected_indices(self.available_list, self.available_model)
+        if selected:
+            self.move_entries(selected, self.available_model, self.in_list_model)
 
     def remove_selected(self):
-        selected_items = self.in_list.selectedItems()
-        if not selected_items:
+        selected = self.selected_indices(self.in_list, self.in_list_model)
+        if selected:
+            self.move_entries(selected, self.in_list_model, self.available_model)
+
+    def move_entries(self, indices, source, target, record=True):
+        """Move sorted name indices from the `source` pane to the `target` pane."""
+        names = [self.all_names[idx] for idx in indices]
+        doc = self.documents[self.list_file]
+        label = doc.label
+        if record:
+            doc.record(target is self.in_list_model, tuple(names))
+        self.update_modified()
+        if target is self.in_list_model:
+            self.current_entries.update(names)
+            for name in names:
+                self.membership[self.source_dir, name].add(label)
+            self.adjust_size(names, 1)
+        else:
+            self.current_entries.difference_update(names)
+            for name in names:
+                self.membership[self.source_dir, name].discard(label)
+            self.adjust_size(names, -1)
+        if len(indices) < BACKGROUND_MOVE_THRESHOLD:
+            source.remove_indices(indices)
+            target.insert_indices(indices)
+            self.update_counts()
             return
-        removed = []
-        for item in selected_items:
-            text = item.text()
-            if text in self.current_entries:
-                self.current_entries.remove(text)
-                removed.append(text)
-        if removed:
-            self.all_in_list = sorted(self.current_entries, key=str.lower)
-            self.all_available += removed
-            self.all_available = sorted(self.all_available, key=str.lower)
-            self.filter_lists()
+        self.add_button.setEnabled(False)
+        self.remove_button.setEnabled(False)
+        self.list_selector.setEnabled(False)
+        self.move_proxy = MoveSignalProxy(self)
+        self.move_proxy.progress.connect(
+            lambda percent: self.status.setText(f"Moving {len(indices)} entries... {percent}%"))
+        names_array = self.all_names
+        generation = self.load_generation
+        self.move_proxy.finished.connect(
+            lambda source_members, target_members: self.finish_move(
+                source, target, source_members, target_members, names_array, generation))
+        self.threadpool.start(MoveWorker(source.members, target.members, indices, self.move_proxy))
+
+    def finish_move(self, source, target, source_members, target_members, names_array, generation):
+        # A refresh or newly opened lists replaced the names array while the move ran.
+        # Its indices point into the old array; set_names already rebuilt both panes
+        # from current_entries, which the move updated up front, so the result is dropped.
+        if names_array is self.all_names and generation == self.load_generation:
+            source.replace_members(source_members)
+            target.replace_members(target_members)
+        self.add_button.setEnabled(True)
+        self.remove_button.setEnabled(True)
+        self.list_selector.setEnabled(True)
+        self.update_counts()
+        if self.list_file:
+            self.status.setText(f"Loaded: {os.path.basename(self.list_file)}")
 
     def animate_loading(self):
         self.loading_dots = (self.loading_dots + 1) % 4
         self.status.setText("Loading" + "." * self.loading_dots)
 
     def update_counts(self):
-        self.counts.setText(f"{self.available_list.count()} available, {self.in_list.count()} in list")
+        self.counts.setText(f"{self.available_model.rowCount()} available, {self.in_list_model.rowCount()} in list")
 
 
 if __name__ == "__main__":
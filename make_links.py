@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:  # Windows has no FICLONE; reflink falls back to hardlink
+    fcntl = None
+
+# Configuration - folders can be absolute or relative
+LIST_DIR = "../ROMs"       # Folder containing .list files
+OUTPUT_DIR = "../ROMs"     # Where target folders will be created (must exist unless --create-output is passed)
+
+# Scratch name used to test whether a link mode works in a target folder
+PROBE_NAME = ".linkprobe"
+
+# Files in target folders that are never treated as extras
+IGNORED_FILES = {"systeminfo.txt", PROBE_NAME}
+
+# Link modes and what each one falls back to when the filesystem refuses it
+LINK_MODES = ("symlink", "hardlink", "reflink")
+FALLBACK_MODE = {"reflink": "hardlink", "hardlink": "symlink"}
+FICLONE = 0x40049409  # Linux _IOW(0x94, 9, int): btrfs, XFS, bcachefs copy-on-write clone
+
+
+def read_list(list_path):
+    """Return the source directory and the cleaned entries of a .list file."""
+    with open(list_path, encoding="utf-8", errors="surrogateescape", newline="") as f:
+        lines = [line.replace("\r", "").strip() for line in f.read().split("\n")]
+    source_dir = lines[0] if lines else ""
+    if source_dir and not source_dir.endswith("/"):
+        source_dir += "/"
+    return source_dir, [line for line in lines[1:] if line]
+
+
+def scan_source(source_dir):
+    """Entries present directly in the source directory, listed once."""
+    with os.scandir(source_dir) as entries:
+        return {entry.name: entry for entry in entries}
+
+
+def scan_target(target_dir):
+    """Map each file or symlink in the target folder to its link target, or its DirEntry for files."""
+    current = {}
+    try:
+        with os.scandir(target_dir) as entries:
+            for entry in entries:
+                if entry.is_symlink():
+                    current[entry.name] = os.readlink(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    current[entry.name] = entry
+    except FileNotFoundError:
+        pass
+    return current
+
+
+def same_device(source_dir, target_dir):
+    """Hardlinks and clones cannot cross filesystems; compare against the nearest existing target parent."""
+    path = os.path.abspath(target_dir)
+    while not os.path.exists(path):
+        path = os.path.dirname(path)
+    return os.stat(source_dir).st_dev == os.stat(path).st_dev
+
+
+def is_current(existing, source, mode, cross_device):
+    """Whether an existing target already materializes source in the requested mode (or its only fallback)."""
+    if isinstance(existing, str):
+        return existing == source and (mode == "symlink" or cross_device)
+    if mode == "symlink":
+        return False
+    target_stat = existing.stat(follow_symlinks=False)
+    source_stat = os.stat(source)
+    if mode == "hardlink":
+        return (target_stat.st_ino, target_stat.st_dev) == (source_stat.st_ino, source_stat.st_dev)
+    # A clone carries the source's size and mtime; a hardlink fallback matches as well.
+    return (target_stat.st_size, target_stat.st_mtime_ns) == (source_stat.st_size, source_stat.st_mtime_ns)
+
+
+def probe_mode(source, target_dir, mode):
+    """First mode in the fallback chain that can link source into target_dir, tried on a scratch name."""
+    probe_path = os.path.join(target_dir, PROBE_NAME)
+    while mode in FALLBACK_MODE:
+        try:
+            link(source, probe_path, mode)
+            os.remove(probe_path)
+            return mode
+        except OSError:
+            mode = FALLBACK_MODE[mode]
+    return mode
+
+
+def plan_list(list_path, output_dir, mode):
+    """Diff one .list against its target folder without touching the disk."""
+    name = os.path.basename(list_path)
+    plan = {
+        "list": list_path,
+        "target_dir": os.path.join(output_dir, os.path.splitext(name)[0]),
+        "create": [], "relink": [], "unchanged": 0, "fallback_links": [],
+        "missing": [], "extras": [], "log": [f"Processing {list_path}..."],
+    }
+    if os.path.getsize(list_path) == 0:
+        plan["log"].append(f"  Warning: {list_path} is empty. Skipping.")
+        return None, plan
+
+    source_dir, entries = read_list(list_path)
+    if not os.path.isdir(source_dir):
+        plan["log"].append(f"  Error: Source directory '{source_dir}' does not exist. Skipping.")
+        return None, plan
+
+    source_entries = scan_source(source_dir)
+    current = scan_target(plan["target_dir"])
+    cross_device = mode != "symlink" and not same_device(source_dir, plan["target_dir"])
+    plan["mode"] = "symlink" if cross_device else mode
+    wanted = set()
+    for entry in entries:
+        source = source_dir + entry
+        # Entries with sub-paths are not in the top-level listing.
+        if "/" not in entry:
+            exists = entry in source_entries
+            is_dir = exists and source_entries[entry].is_dir()
+        else:
+            exists = os.path.lexists(source)
+            is_dir = os.path.isdir(source)
+        link_name = os.path.basename(entry)
+        wanted.add(link_name)
+        if not exists:
+            plan["missing"].append(source)
+        elif link_name not in current:
+            plan["create"].append((link_name, source, is_dir))
+        elif not is_current(current[link_name], source, "symlink" if is_dir else mode, cross_device):
+            plan["relink"].append((link_name, source, is_dir))
+            if current[link_name] == source:
+                # A symlink from an earlier fallback; apply_plan keeps it if the mode still fails.
+                plan["fallback_links"].append(link_name)
+        else:
+            plan["unchanged"] += 1
+
+    plan["extras"] = sorted(
+        f for f in current if f not in wanted and f.strip() not in IGNORED_FILES
+    )
+    return source_dir, plan
+
+
+def clone_file(source, target_path):
+    """Copy-on-write clone of source; raises OSError where the filesystem cannot share extents."""
+    if fcntl is None:
+        raise OSError("reflinks are not supported on this platform")
+    with open(source, "rb") as src, open(target_path, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    shutil.copystat(source, target_path)
+
+
+def link(source, target_path, mode="symlink"):
+    """Replace target_path with source materialized in mode, like `ln -sf` but atomic."""
+    tmp_path = target_path + ".linktmp"
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        if mode == "reflink":
+            clone_file(source, tmp_path)
+        elif mode == "hardlink":
+            os.link(source, tmp_path)
+        else:
+            os.symlink(source, tmp_path)
+    except OSError:
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, target_path)
+
+
+def apply_plan(plan, create_links, remove_extras):
+    log = plan["log"]
+    target_dir = plan["target_dir"]
+    for source in plan["missing"]:
+        log.append(f"  Warning: '{source}' does not exist. Skipping.")
+
+    if create_links and plan["fallback_links"]:
+        # Probing writes a scratch link, so it only happens when links are being made.
+        sample = next(source for _, source, is_dir in plan["relink"] if not is_dir)
+        mode = probe_mode(sample, target_dir, plan["mode"])
+        if mode == "symlink":
+            keep = set(plan["fallback_links"])
+            plan["relink"] = [change for change in plan["relink"] if change[0] not in keep]
+            plan["unchanged"] += len(keep)
+        plan["mode"] = mode
+
+    changes = plan["create"] + plan["relink"]
+    if create_links and changes:
+        try:
+            os.makedirs(target_dir, exist_ok=True)
+        except OSError:
+            log.append(f"  Error: Failed to create target directory '{target_dir}'. Skipping.")
+            return plan
+        mode = plan["mode"]
+        for link_name, source, is_dir in changes:
+            target_path = os.path.join(target_dir, link_name)
+            if is_dir:
+                link(source, target_path)
+                continue
+            while True:
+                try:
+                    link(source, target_path, mode)
+                    break
+                except OSError as e:
+                    if mode not in FALLBACK_MODE:
+                        raise
+                    # Once a mode fails the rest of this list would fail the same way.
+                    log.append(f"  Note: {mode} failed for '{link_name}' ({e.strerror or e}); "
+                               f"falling back to {FALLBACK_MODE[mode]}")
+                    mode = FALLBACK_MODE[mode]
+        plan["mode"] = mode
+        log.append(f"  Linked {len(plan['create'])} new, relinked {len(plan['relink'])}, "
+                   f"{plan['unchanged']} already up to date in {target_dir} ({mode})")
+    elif changes:
+        log.append(f"  Would link {len(plan['create'])} new and relink {len(plan['relink'])} in {target_dir}")
+        if plan["fallback_links"]:
+            log.append(f"    {len(plan['fallback_links'])} of these are fallback symlinks, kept if "
+                       f"{plan['mode']} still fails there")
+    elif plan["unchanged"]:
+        log.append(f"  All {plan['unchanged']} links already up to date in {target_dir}")
+    else:
+        log.append(f"  No valid files to link for {plan['list']} — target folder not created.")
+
+    for extra in plan["extras"]:
+        relative_path = f"{os.path.basename(target_dir)}/{extra}"
+        if remove_extras:
+            log.append(f"    Removing extra: {relative_path}")
+            os.remove(os.path.join(target_dir, extra))
+        else:
+            log.append(f"    Extra file: {relative_path}")
+    return plan
+
+
+def process_list(list_path, output_dir, mode, create_links, remove_extras):
+    try:
+        source_dir, plan = plan_list(list_path, output_dir, mode)
+        if source_dir is None:
+            return plan
+        return apply_plan(plan, create_links, remove_extras)
+    except OSError as e:
+        return {"list": list_path, "target_dir": "", "create": [], "relink": [], "unchanged": 0,
+                "missing": [], "extras": [], "log": [f"Processing {list_path}...", f"  Error: {e}"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create only the changed symlinks for every .list file.")
+    parser.add_argument("--create-output", action="store_true", help="Create OUTPUT_DIR if it does not exist")
+    parser.add_argument("--remove", action="store_true", help="Delete files in target folders that are not in the .list")
+    parser.add_argument("--check", action="store_true", help="Only report what would change (like check_extras.sh)")
+    parser.add_argument("--list-dir", default=LIST_DIR, help=f"Folder containing .list files (default: {LIST_DIR})")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help=f"Where target folders are created (default: {OUTPUT_DIR})")
+    parser.add_argument("--mode", choices=LINK_MODES, default="symlink",
+                        help="How entries are materialized; hardlink and reflink fall back when the filesystem refuses "
+                             "(reflink -> hardlink -> symlink). Default: symlink")
+    parser.add_argument("--jobs", type=int, default=4, help="Number of lists processed in parallel (default: 4)")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.output_dir):
+        if args.create_output and not args.check:
+            print(f"Creating OUTPUT_DIR '{args.output_dir}'...")
+            os.makedirs(args.output_dir, exist_ok=True)
+        else:
+            print(f"Error: OUTPUT_DIR '{args.output_dir}' does not exist. Use --create-output to allow creation.")
+            return 1
+
+    list_files = sorted(
+        os.path.join(args.list_dir, f) for f in os.listdir(args.list_dir) if f.endswith(".list")
+    )
+    if not list_files:
+        print(f"No .list files found in '{args.list_dir}'. Nothing to process.")
+        return 1
+
+    create_links = not args.check
+    remove_extras = args.remove and not args.check
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        plans = list(pool.map(
+            lambda path: process_list(path, args.output_dir, args.mode, create_links, remove_extras), list_files))
+
+    # Print each list's log in order so the report reads like a sequential run.
+    for plan in plans:
+        print("\n".join(plan["log"]))
+
+    created = sum(len(p["create"]) for p in plans)
+    relinked = sum(len(p["relink"]) for p in plans)
+    unchanged = sum(p["unchanged"] for p in plans)
+    missing = sum(len(p["missing"]) for p in plans)
+    extras = [f"{os.path.basename(p['target_dir'])}/{e}" for p in plans for e in p["extras"]]
+    print("")
+    print(f"{len(plans)} lists: {created} new, {relinked} relinked, {unchanged} unchanged, "
+          f"{missing} missing, {len(extras)} extra")
+
+    if remove_extras and extras:
+        print("")
+        print("Removed...")
+        for f in extras:
+            print(f"    {f}")
+    elif extras:
+        print("")
+        print("Done. No files were removed.")
+        print("To delete games not in the .list files, re-run this script with --remove:")
+        print(f"  ./{os.path.basename(__file__)} --remove")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
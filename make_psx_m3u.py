@@ -4,50 +4,182 @@ import os
 import shutil
 import argparse
 import re
+import json
+from concurrent.futures import ProcessPoolExecutor
 from xml.etree import ElementTree as ET
 
-PSX_DIR = "/mnt/Stuff/ES-DE/ROMs/psx"
-GAMELIST = os.path.join(PSX_DIR, "gamelist.xml")
-IMGS_DIR = os.path.join(PSX_DIR, "Imgs")
-
-
-def restore_backups():
-    print("🧪 Test mode: Restoring backups and removing .m3u files...")
-    if os.path.exists(GAMELIST + ".bak"):
-        print("🛠️  Restoring gamelist.xml from backup...")
-        shutil.copyfile(GAMELIST + ".bak", GAMELIST)
-
-    imgs_backup = IMGS_DIR + ".bak"
-    if os.path.exists(imgs_backup):
-        print("🛠️  Restoring Imgs/ from Imgs.bak...")
-        shutil.rmtree(IMGS_DIR)
-        shutil.copytree(imgs_backup, IMGS_DIR)
-
-    print("🧼 Removing existing .m3u files for testing...")
-    for file in os.listdir(PSX_DIR):
-        if file.endswith(".m3u"):
-            os.remove(os.path.join(PSX_DIR, file))
-
-
-def load_gamelist():
-    tree = ET.parse(GAMELIST)
-    root = tree.getroot()
-    return tree, root
-
-
-def find_game_by_path(root, path):
-    for game in root.findall("game"):
-        if game.findtext("path") == path:
-            return game
-    return None
-
-
-def remove_game_by_path(root, path):
-    for game in root.findall("game"):
-        if game.findtext("path") == path:
-            root.remove(game)
-            return True
-    return False
+ROMS_DIR = "/mnt/Stuff/ES-DE/ROMs"
+# Disc-based systems whose multi-disc sets get an .m3u
+DEFAULT_SYSTEMS = ["psx", "segacd", "pcecd", "saturn", "dreamcast", "3do", "pcfx", "neocd"]
+
+# Undo data lives next to ROMS_DIR (same filesystem, so trashing is a rename) but outside
+# the synced tree, so trashed images and gamelist backups are never copied to devices.
+UNDO_DIR = os.path.join(os.path.dirname(ROMS_DIR), ".m3u_undo")
+JOURNAL_NAME = "journal.jsonl"
+TRASH_DIR = "trash"
+
+# "Title (USA) (Disc 2) (Rev 1).chd" -> base "Title (USA)", disc 2
+DISC_RE = re.compile(r"^(?P<base>.+?) \(Disc (?P<disc>[1-9])\)(?P<extra>.*)\.(?P<ext>chd|cue|ccd|iso|cdi|gdi)$", re.IGNORECASE)
+
+
+class Journal:
+    """Undo log for one system folder, written before each change so a rollback can replay it in reverse.
+
+    Deleted and overwritten files are moved (or hardlinked) into a trash folder under UNDO_DIR
+    instead of being copied, so keeping the undo data costs no extra disk space.
+    """
+
+    def __init__(self, system_dir):
+        self.system_dir = system_dir
+        self.undo_dir = os.path.join(UNDO_DIR, os.path.basename(system_dir))
+        self.path = os.path.join(self.undo_dir, JOURNAL_NAME)
+        self.trash = os.path.join(self.undo_dir, TRASH_DIR)
+        self.seq = len(self.entries())
+
+    def entries(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def abs(self, rel):
+        return os.path.join(self.system_dir, rel)
+
+    def rel(self, path):
+        return os.path.relpath(path, self.system_dir)
+
+    def record(self, op, **fields):
+        self.seq += 1
+        os.makedirs(self.undo_dir, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"op": op, **fields}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def trash_path(self, path):
+        os.makedirs(self.trash, exist_ok=True)
+        return os.path.join(self.trash, f"{self.seq + 1:06d}-{os.path.basename(path)}")
+
+    def create(self, path, text):
+        self.record("create", path=self.rel(path))
+        with open(path, "w") as f:
+            f.write(text)
+
+    def rename(self, src, dst):
+        self.record("rename", src=self.rel(src), dst=self.rel(dst))
+        os.rename(src, dst)
+
+    def delete(self, path):
+        trash = self.trash_path(path)
+        self.record("delete", path=self.rel(path), trash=os.path.basename(trash))
+        os.rename(path, trash)
+
+    def replace(self, path, tmp_path):
+        """Swap tmp_path into path; the old inode stays reachable from the trash."""
+        backup = self.trash_path(path)
+        try:
+            os.link(path, backup)
+        except OSError:  # Filesystems without hardlinks
+            shutil.copy2(path, backup)
+        self.record("replace", path=self.rel(path), backup=os.path.basename(backup))
+        os.replace(tmp_path, path)
+
+    def rollback(self, out=print):
+        entries = self.entries()
+        system = os.path.basename(self.system_dir)
+        if not entries:
+            out(f"ℹ️  [{system}] Nothing to roll back.")
+            return 0
+        out(f"\n⏪ [{system}] Rolling back {len(entries)} changes...")
+        # Entries are written before their change, so the last one may never have happened.
+        for entry in reversed(entries):
+            op = entry["op"]
+            if op == "create":
+                path = self.abs(entry["path"])
+                if os.path.exists(path):
+                    os.remove(path)
+                    out(f"🧼 Removed {entry['path']}")
+            elif op == "rename":
+                src, dst = self.abs(entry["src"]), self.abs(entry["dst"])
+                if os.path.exists(dst) and not os.path.exists(src):
+                    os.rename(dst, src)
+                    out(f"🖼️  Renamed back: {entry['dst']} → {entry['src']}")
+            elif op == "delete":
+                trash = os.path.join(self.trash, entry["trash"])
+                if os.path.exists(trash):
+                    os.replace(trash, self.abs(entry["path"]))
+                    out(f"♻️  Restored {entry['path']}")
+            elif op == "replace":
+                backup = os.path.join(self.trash, entry["backup"])
+                if os.path.exists(backup):
+                    os.replace(backup, self.abs(entry["path"]))
+                    out(f"🛠️  Restored {entry['path']}")
+        self.purge()
+        return len(entries)
+
+    def purge(self):
+        """Forget the journal and empty the trash, making the current state permanent."""
+        shutil.rmtree(self.undo_dir, ignore_errors=True)
+        self.seq = 0
+
+
+def scan_disc_sets(names):
+    """Group disc images by title from one directory listing: {base: [(disc, filename), ...]}."""
+    sets = {}
+    ext_of_disc1 = {}
+    for name in names:
+        match = DISC_RE.match(name)
+        if match:
+            sets.setdefault(match.group("base"), []).append((int(match.group("disc")), name))
+            if match.group("disc") == "1":
+                ext_of_disc1[match.group("base")] = match.group("ext").lower()
+    # Only titles that have a Disc 1; the playlist uses the same image format as Disc 1.
+    return {
+        base: sorted(d for d in discs if d[1].lower().endswith("." + ext_of_disc1[base]))
+        for base, discs in sets.items() if base in ext_of_disc1
+    }
+
+
+class GamelistIndex:
+    """gamelist.xml with <game> entries indexed by <path>; removals are applied once on save."""
+
+    def __init__(self, path):
+        self.path = path
+        self.by_path = {}
+        self.removed = set()
+        if not os.path.isfile(path):  # Playlists are still built for systems without a gamelist
+            self.tree = None
+            return
+        self.tree = ET.parse(path)
+        self.root = self.tree.getroot()
+        for game in self.root.findall("game"):
+            self.by_path.setdefault(game.findtext("path"), game)
+
+    def find(self, path):
+        return self.by_path.get(path)
+
+    def move(self, old_path, new_path):
+        game = self.by_path.pop(old_path)
+        game.find("path").text = new_path
+        self.by_path[new_path] = game
+
+    def remove(self, path):
+        game = self.by_path.pop(path, None)
+        if game is None:
+            return False
+        self.removed.add(id(game))
+        return True
+
+    def save(self, journal):
+        if self.tree is None:
+            return
+        if self.removed:
+            self.root[:] = [child for child in self.root if id(child) not in self.removed]
+        # Write beside the original and swap it in, so the journal's backup keeps the old inode.
+        tmp_path = self.path + ".tmp"
+        self.tree.write(tmp_path, encoding="utf-8", xml_declaration=True)
+        journal.replace(self.path, tmp_path)
 
 
 def update_image_path(game, new_path):
@@ -59,104 +191,143 @@ def update_image_path(game, new_path):
         image.text = new_path
 
 
-def main(test_mode=False):
-    os.chdir(PSX_DIR)
-    print("\n🎮 Converting multi-disc games to .m3u in gamelist.xml...\n")
-
-    shutil.copyfile(GAMELIST, GAMELIST + ".bak")
-    print(f"📝 Backup created: {GAMELIST}.bak")
-
-    tree, root = load_gamelist()
+def build_system(system_dir):
+    """Create .m3u playlists for one system folder; returns its log lines."""
+    lines = []
+    out = lines.append
+    gamelist_path = os.path.join(system_dir, "gamelist.xml")
+    system = os.path.basename(system_dir)
+    out(f"\n🎮 [{system}] Converting multi-disc games to .m3u in gamelist.xml...\n")
+
+    names = set(os.listdir(system_dir))
+    disc_sets = scan_disc_sets(names)
+    if not disc_sets:
+        out("ℹ️  No multi-disc games found.")
+        return lines
+    if not os.path.isfile(gamelist_path):
+        out("⚠️  No gamelist.xml — only creating .m3u files")
+
+    journal = Journal(system_dir)
+    gamelist = GamelistIndex(gamelist_path)
     updated = False
 
-    for filename in os.listdir("."):
-        if not re.search(r"\(Disc 1\).*\.chd$", filename, re.IGNORECASE):
-            continue
-
-        base_name = re.sub(r" \(Disc 1\)( \(Rev \d+\))?\.chd$", "", filename, flags=re.IGNORECASE)
+    for base_name, discs in sorted(disc_sets.items()):
+        disc1 = discs[0][1]
         m3u_file = f"{base_name}.m3u"
         m3u_path = f"./{m3u_file}"
-        disc1_path = f"./{filename}"
+        disc1_path = f"./{disc1}"
 
-        print(f"\n🕹️  Processing: \033[1m{base_name}\033[0m")
-        print("──────────────────────────────────────────────")
+        out(f"\n🕹️  Processing: \033[1m{base_name}\033[0m")
+        out("──────────────────────────────────────────────")
 
-        m3u_in_gamelist = find_game_by_path(root, m3u_path) is not None
-        m3u_file_exists = os.path.exists(m3u_file)
+        m3u_in_gamelist = gamelist.find(m3u_path) is not None
+        m3u_file_exists = m3u_file in names
 
         if m3u_in_gamelist and m3u_file_exists:
-            print("⏩ .m3u already in gamelist and file exists — skipping")
+            out("⏩ .m3u already in gamelist and file exists — skipping")
         else:
             if not m3u_file_exists:
-                chds = sorted([f for f in os.listdir(".") if re.match(re.escape(base_name) + r" \(Disc [1-9]\).*\.chd", f)])
-                print(f"📦 Creating {m3u_file} with:")
-                with open(m3u_file, "w") as f:
-                    for chd in chds:
-                        print(f"   • {chd}")
-                        f.write(f"{chd}\n")
+                out(f"📦 Creating {m3u_file} with:")
+                for _, chd in discs:
+                    out(f"   • {chd}")
+                journal.create(os.path.join(system_dir, m3u_file), "".join(f"{chd}\n" for _, chd in discs))
+                names.add(m3u_file)
             else:
-                print(f"📁 {m3u_file} already exists — skipping creation")
+                out(f"📁 {m3u_file} already exists — skipping creation")
 
-            if not m3u_in_gamelist:
-                game = find_game_by_path(root, disc1_path)
-                if game:
-                    game.find("path").text = m3u_path
-                    updated = True
-                    print("🛠️  Updated <path> in gamelist.xml")
+            if not m3u_in_gamelist and gamelist.find(disc1_path) is not None:
+                gamelist.move(disc1_path, m3u_path)
+                updated = True
+                out("🛠️  Updated <path> in gamelist.xml")
 
-        game = find_game_by_path(root, m3u_path)
-        if game and game.find("image") is not None:
+        game = gamelist.find(m3u_path)
+        if game is not None and game.find("image") is not None:
             image_path = game.find("image").text.strip()
-            old_image = os.path.normpath(os.path.join(PSX_DIR, image_path.strip("./")))
+            old_image = os.path.normpath(os.path.join(system_dir, image_path.strip("./")))
             new_image_rel = f"./Imgs/{base_name}.png"
-            new_image_abs = os.path.normpath(os.path.join(PSX_DIR, new_image_rel.strip("./")))
+            new_image_abs = os.path.normpath(os.path.join(system_dir, new_image_rel.strip("./")))
 
             if os.path.exists(old_image) and old_image != new_image_abs:
-                print(f"🖼️  Renaming image: {image_path} → {new_image_rel}")
-                os.rename(old_image, new_image_abs)
+                out(f"🖼️  Renaming image: {image_path} → {new_image_rel}")
+                journal.rename(old_image, new_image_abs)
                 update_image_path(game, new_image_rel)
                 updated = True
             elif os.path.exists(old_image):
-                print(f"ℹ️  Image already correctly named: {new_image_rel}")
+                out(f"ℹ️  Image already correctly named: {new_image_rel}")
 
-        if remove_game_by_path(root, disc1_path):
-            print(f"❌ Removing duplicate Disc 1 entry: {disc1_path}")
+        if gamelist.remove(disc1_path):
+            out(f"❌ Removing duplicate Disc 1 entry: {disc1_path}")
             updated = True
         else:
-            print(f"ℹ️  No <game> entry found for: {disc1_path} — skipping")
+            out(f"ℹ️  No <game> entry found for: {disc1_path} — skipping")
 
         current_image = None
-        game = find_game_by_path(root, m3u_path)
-        if game and game.find("image") is not None:
+        if game is not None and game.find("image") is not None:
             current_image = game.find("image").text
 
-        for f in os.listdir("."):
-            if re.match(re.escape(base_name) + r" \(Disc [2-9]\).*\.chd", f):
-                disc_path = f"./{f}"
-                if remove_game_by_path(root, disc_path):
-                    print(f"❌ Removing extra disc entry: {f}")
-                    updated = True
-                else:
-                    print(f"ℹ️  No <game> entry found for: {f} — skipping")
+        for _, f in discs[1:]:
+            disc_path = f"./{f}"
+            if gamelist.remove(disc_path):
+                out(f"❌ Removing extra disc entry: {f}")
+                updated = True
+            else:
+                out(f"ℹ️  No <game> entry found for: {f} — skipping")
 
-                img_path = f"./Imgs/{f[:-4]}.png"
-                if os.path.exists(img_path):
-                    if img_path == current_image:
-                        print(f"🛑 Not deleting image (used by .m3u): {img_path}")
-                    else:
-                        print(f"🗑️  Deleting image: {img_path}")
-                        os.remove(img_path)
+            img_path = f"./Imgs/{os.path.splitext(f)[0]}.png"
+            img_abs = os.path.join(system_dir, img_path[2:])
+            if os.path.exists(img_abs):
+                if img_path == current_image:
+                    out(f"🛑 Not deleting image (used by .m3u): {img_path}")
+                else:
+                    out(f"🗑️  Deleting image: {img_path}")
+                    journal.delete(img_abs)
 
     if updated:
-        tree.write(GAMELIST, encoding="utf-8", xml_declaration=True)
-    print("\n✅ All multi-disc conversions complete.\n")
+        gamelist.save(journal)
+    if journal.seq:
+        out(f"📝 {journal.seq} changes journaled — undo with --rollback")
+    out(f"\n✅ [{system}] All multi-disc conversions complete.\n")
+    return lines
+
+
+def run_system(system_dir, action):
+    lines = []
+    system = os.path.basename(system_dir)
+    try:
+        journal = Journal(system_dir)
+        if action == "purge":
+            if journal.seq:
+                lines.append(f"🧹 [{system}] Forgetting {journal.seq} journaled changes and emptying {journal.trash}")
+            journal.purge()
+            return lines
+        if action in ("rollback", "test"):
+            journal.rollback(lines.append)
+            if action == "rollback":
+                return lines
+        return lines + build_system(system_dir)
+    except Exception as e:
+        return lines + [f"💥 [{system}] {e}"]
+
+
+def main(action="build", systems=None, jobs=4):
+    system_dirs = [os.path.join(ROMS_DIR, s) for s in (systems or DEFAULT_SYSTEMS)]
+    system_dirs = [d for d in system_dirs if os.path.isdir(d)]
+    # Each system is independent; its log is printed whole, in order, when it finishes.
+    with ProcessPoolExecutor(max_workers=max(1, jobs)) as pool:
+        for lines in pool.map(run_system, system_dirs, [action] * len(system_dirs)):
+            if lines:
+                print("\n".join(lines))
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--test", action="store_true", help="Restore backups and remove .m3u files for testing")
+    parser.add_argument("--test", action="store_true", help="Roll back the previous run, then convert again")
+    parser.add_argument("--rollback", action="store_true", help="Undo every journaled change and stop")
+    parser.add_argument("--purge", action="store_true", help=f"Keep the current state: delete the journal and trash in {UNDO_DIR}")
+    parser.add_argument("--systems", type=str, help=f"Comma-separated systems under {ROMS_DIR} (default: {','.join(DEFAULT_SYSTEMS)})")
+    parser.add_argument("--jobs", type=int, default=4, help="Systems processed in parallel (default: 4)")
     args = parser.parse_args()
 
-    if args.test:
-        restore_backups()
-    main(test_mode=args.test)
+    action = "rollback" if args.rollback else "purge" if args.purge else "test" if args.test else "build"
+    systems = [s.strip() for s in args.systems.split(",")] if args.systems else None
+    main(action=action, systems=systems, jobs=args.jobs)
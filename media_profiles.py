@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+"""Device-sized media for handhelds, shared by quick_copy.py and miyoo_sync.py.
+
+Images are downscaled with Pillow and videos optionally re-encoded with a local ffmpeg.
+Every output is cached by source content hash and profile, so an asset is converted
+once no matter how many cards or systems it is copied to.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import platform
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image
+except ImportError:  # Without Pillow images are copied at full size
+    Image = None
+
+# Screen size per device; images are fitted inside it, videos scaled to its width.
+DEVICE_PROFILES = {
+    "miyoo-mini": {"size": (640, 480), "video_crf": 30},
+    "miyoo-mini-plus": {"size": (640, 480), "video_crf": 30},
+    "miyoo-mini-v4": {"size": (750, 560), "video_crf": 30},
+    "rg35xx": {"size": (640, 480), "video_crf": 30},
+    "rg353": {"size": (640, 480), "video_crf": 28},
+}
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".webm", ".avi")
+HASH_CHUNK = 1024 * 1024
+PROFILE_VERSION = 1  # Bump when the conversion settings change to invalidate old outputs
+
+is_windows = platform.system() == "Windows"
+ffmpeg = shutil.which("ffmpeg")
+
+
+def cache_root() -> Path:
+    base = os.environ.get("LOCALAPPDATA") if is_windows else os.environ.get("XDG_CACHE_HOME")
+    return Path(base or Path.home() / ".cache") / "rom_scripts" / "media_cache"
+
+
+class MediaCache:
+    """Converted copies of source media for one device profile."""
+
+    def __init__(self, profile, transcode_videos=False, workers=4):
+        if profile not in DEVICE_PROFILES:
+            raise ValueError(f"Unknown device profile '{profile}' (choose from: {', '.join(DEVICE_PROFILES)})")
+        self.profile = profile
+        self.settings = DEVICE_PROFILES[profile]
+        self.transcode_videos = transcode_videos and ffmpeg is not None
+        self.workers = workers
+        self.dir = cache_root() / profile
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.hash_index_path = cache_root() / "source_hashes.json"
+        self.lock = threading.Lock()
+        try:
+            with open(self.hash_index_path, encoding="utf-8") as f:
+                self.hash_index = json.load(f)
+        except (OSError, ValueError):
+            self.hash_index = {}
+        self.converted = 0
+
+    def source_hash(self, src: Path):
+        """Content hash of src, re-read only when its size or mtime changed."""
+        st = os.stat(src)
+        key = str(src)
+        with self.lock:
+            cached = self.hash_index.get(key)
+        if cached and cached[:2] == [st.st_size, st.st_mtime_ns]:
+            return cached[2]
+        digest = hashlib.sha1()
+        with open(src, "rb") as f:
+            for block in iter(lambda: f.read(HASH_CHUNK), b""):
+                digest.update(block)
+        with self.lock:
+            self.hash_index[key] = [st.st_size, st.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def output_name(self, src: Path):
+        ext = src.suffix.lower()
+        if ext in VIDEO_EXTENSIONS and self.transcode_videos:
+            return src.with_suffix(".mp4").name
+        return src.name
+
+    def convertible(self, src: Path):
+        ext = src.suffix.lower()
+        return (ext in IMAGE_EXTENSIONS and Image is not None) or (ext in VIDEO_EXTENSIONS and self.transcode_videos)
+
+    def cached_path(self, src: Path) -> Path:
+        ext = Path(self.output_name(src)).suffix
+        key = hashlib.sha1(f"{self.source_hash(src)}:{self.profile}:{PROFILE_VERSION}".encode()).hexdigest()
+        return self.dir / key[:2] / (key + ext)
+
+    def lookup(self, src: Path):
+        """The converted file if it already exists, without converting (for dry runs)."""
+        src = Path(src)
+        if not self.convertible(src):
+            return src
+        out = self.cached_path(src)
+        return out if out.exists() else None
+
+    def get(self, src: Path) -> Path:
+        """Path of the device-sized version of src, converting it on first use."""
+        src = Path(src)
+        if not self.convertible(src):
+            return src
+        out = self.cached_path(src)
+        ext = out.suffix
+        if out.exists():
+            return out
+        out.parent.mkdir(exist_ok=True)
+        tmp = out.with_name(f"{out.stem}.{threading.get_ident()}.tmp{ext}")
+        try:
+            if ext in VIDEO_EXTENSIONS:
+                self.convert_video(src, tmp)
+            else:
+                self.convert_image(src, tmp)
+            os.replace(tmp, out)
+        except Exception:
+            if tmp.exists():
+                tmp.unlink()
+            raise
+        with self.lock:
+            self.converted += 1
+        return out
+
+    def convert_image(self, src: Path, out: Path):
+        with Image.open(src) as img:
+            if img.width <= self.settings["size"][0] and img.height <= self.settings["size"][1]:
+                shutil.copyfile(src, out)  # Already small enough; re-encoding would only cost quality
+                return
+            img.thumbnail(self.settings["size"], Image.LANCZOS)
+            if out.suffix.lower() in (".jpg", ".jpeg"):
+                img.convert("RGB").save(out, quality=88)
+            else:
+                img.save(out)
+
+    def convert_video(self, src: Path, out: Path):
+        width = self.settings["size"][0]
+        cmd = [
+            ffmpeg, "-nostdin", "-loglevel", "error", "-y", "-i", str(src),
+            "-vf", f"scale='min({width},iw)':-2",
+            "-c:v", "libx264", "-preset", "veryfast", "-crf", str(self.settings["video_crf"]),
+            "-c:a", "aac", "-b:a", "64k", "-movflags", "+faststart", str(out),
+        ]
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    def prepare(self, sources):
+        """Convert sources in parallel.
+
+        Returns ({src: cached output path}, [(src, error)]). Failed sources map to themselves;
+        the errors are returned rather than printed so callers can keep their output in order.
+        """
+        failures = []
+
+        def one(src):
+            try:
+                return src, self.get(src)
+            except Exception as e:
+                failures.append((src, e))
+                return src, Path(src)
+
+        # Pillow and ffmpeg both do their work outside the GIL, so threads keep every core busy.
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            results = dict(pool.map(one, sources))
+        self.save()
+        return results, failures
+
+    def save(self):
+        with self.lock:
+            tmp = self.hash_index_path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.hash_index, f)
+            os.replace(tmp, self.hash_index_path)
+
+
+def warn_missing_tools(transcode_videos):
+    if Image is None:
+        print("⚠️  Pillow is not installed — images will be copied at full size (pip install Pillow).")
+    if transcode_videos and ffmpeg is None:
+        print("⚠️  ffmpeg not found on PATH — videos will be copied unchanged.")
@@ -1,12 +1,19 @@
 #!/usr/bin/env python3
 
 import os
+import json
+import filecmp
+import hashlib
 import platform
+import shutil
 import subprocess
 import sys
 import xml.etree.ElementTree as ET
 from pathlib import Path
 
+import copy_engine
+import media_profiles
+
 # Detect OS
 is_windows = platform.system() == "Windows"
 
@@ -24,28 +31,137 @@ system_map = {
     "segacd": "SEGACD", "snes": "SFC", "supergrafx": "SGFX", "tg16": "PCE", "ws": "WS"
 }
 
-# Files to exclude
-excludes = ["~Filter.miyoocmd", "~Refresh roms.miyoocmd"]
+# Files to exclude (the gamelist is written by clean_xml straight from the source)
+excludes = ["~Filter.miyoocmd", "~Refresh roms.miyoocmd", "gamelist.xml", "miyoogamelist.xml"]
+# Folders left out of the robocopy/rsync mirror (Imgs is synced separately when resizing)
+exclude_dirs = []
 
 # Clean XML
-def clean_xml(xml_file):
+KEEP_TAGS = ("path", "name", "image")
+GAMELIST_CHUNK = 1024 * 1024
+CLEAN_CACHE = copy_engine.cache_dir().parent / "miyoo_sync" / "clean_xml.json"
+
+
+def load_clean_cache():
+    try:
+        with open(CLEAN_CACHE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_clean_cache(cache):
+    CLEAN_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = CLEAN_CACHE.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(tmp, CLEAN_CACHE)
+
+
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def iter_gamelist(src_file):
+    """Yield the <gameList> root, then each of its children as soon as it is complete."""
+    parser = ET.XMLPullParser(events=("start", "end"))
+    depth = 0
+    with open(src_file, "rb") as f:
+        # ES-DE may put <alternativeEmulator> before <gameList>; start feeding at the root we want.
+        pending = b""
+        while True:
+            chunk = f.read(GAMELIST_CHUNK)
+            if not chunk:
+                raise ValueError("<gameList> section not found")
+            pending += chunk
+            index = pending.find(b"<gameList>")
+            if index != -1:
+                chunk = pending[index:]
+                break
+            pending = pending[-len(b"<gameList>"):]
+
+        while chunk:
+            parser.feed(chunk)
+            for event, elem in parser.read_events():
+                if event == "start":
+                    if depth == 0:
+                        yield elem
+                    depth += 1
+                    continue
+                depth -= 1
+                if depth == 1:
+                    yield elem
+                elif depth == 0:
+                    return
+            chunk = f.read(GAMELIST_CHUNK)
+        parser.close()
+
+
+def write_clean_xml(src_file, out):
+    """Stream src_file into out, keeping only path, name and image inside each <game>."""
+    out.write('<?xml version="1.0"?>\n')
+    entries = iter_gamelist(src_file)
+    root = next(entries)
+    out.write(f"<{root.tag}>\n")
+    for elem in entries:
+        if elem.tag == "game":
+            for child in list(elem):
+                if child.tag not in KEEP_TAGS:
+                    elem.remove(child)
+        ET.indent(elem, space="\t", level=1)
+        elem.tail = "\n"
+        out.write("\t" + ET.tostring(elem, encoding="unicode"))
+        root.clear()  # Drop finished entries so memory stays flat on huge gamelists
+    out.write(f"</{root.tag}>\n")
+
+
+def clean_xml(src_file, dst_file, cache):
+    key = str(dst_file)
+    entry = cache.get(key)
+    st = src_file.stat()
+    # The source is only re-hashed when its size or mtime changed.
+    if entry and entry["source"][:2] == [st.st_size, st.st_mtime_ns]:
+        digest = entry["source"][2]
+    else:
+        digest = file_sha1(src_file)
+    if entry and entry["source"][2] == digest and dst_file.exists():
+        dst_st = dst_file.stat()
+        if entry["output"] == [dst_st.st_size, dst_st.st_mtime_ns]:
+            entry["source"] = [st.st_size, st.st_mtime_ns, digest]
+            print(f"⏩ Unchanged: {dst_file}")
+            return
+
+    tmp = dst_file.with_name(dst_file.name + ".tmp")
     try:
-        tree = ET.parse(xml_file)
-        root = tree.getroot()
-        for game in root.findall("game"):
-            for child in list(game):
-                if child.tag not in ("path", "name", "image"):
-                    game.remove(child)
-        tree.write(xml_file, encoding="utf-8", xml_declaration=True)
-        print(f"🧼 Cleaned: {xml_file}")
+        with open(tmp, "w", encoding="utf-8", newline="\n") as out:
+            write_clean_xml(src_file, out)
     except Exception as e:
-        print(f"⚠️ XML cleanup failed: {e}")
+        # The device still needs a gamelist, so fall back to the uncleaned copy.
+        shutil.copyfile(src_file, tmp)
+        os.replace(tmp, dst_file)
+        print(f"⚠️ XML cleanup failed, copied uncleaned: {e}")
+        return
+
+    if dst_file.exists() and filecmp.cmp(tmp, dst_file, shallow=False):
+        tmp.unlink()
+        print(f"⏩ Unchanged: {dst_file}")
+    else:
+        os.replace(tmp, dst_file)
+        print(f"🧼 Cleaned: {dst_file}")
+    dst_st = dst_file.stat()
+    cache[key] = {"source": [st.st_size, st.st_mtime_ns, digest], "output": [dst_st.st_size, dst_st.st_mtime_ns]}
 
 # Sync for Windows with unfiltered robocopy output
 def sync_windows_with_progress(src_path, dst_path):
     robocopy_cmd = ["robocopy", str(src_path), str(dst_path), "/MIR", "/NDL", "/NJH", "/NJS", "/NC"]
     for pattern in excludes:
         robocopy_cmd += ["/XF", pattern]
+    for folder in exclude_dirs:
+        robocopy_cmd += ["/XD", folder]
 
     print("🚚 Syncing files...")
 
@@ -82,18 +198,79 @@ def sync_windows_with_progress(src_path, dst_path):
 
 
 
+# Sync with the built-in engine (--native, or when robocopy/rsync is missing)
+def sync_native(src_path, dst_path):
+    print("🚚 Syncing files...")
+    records = copy_engine.sync_tree(
+        src_path, dst_path, mirror=True, excludes=excludes + exclude_dirs, size_only=True,
+        progress=lambda text: print(f"\r{text}  \r", end='', flush=True)
+    )
+    sys.stdout.write("\r" + " " * 80 + "\r")
+    copied = sum(1 for r in records if r["action"] in ("add", "update"))
+    print(f"✅ Sync complete: {src_path} → {dst_path} ({copied} copied)")
+
+
+# Sync Imgs through the device-sized media cache
+def sync_images(src_imgs, dst_imgs, cache):
+    if not src_imgs.is_dir():
+        return
+    sources = [p for p in src_imgs.iterdir() if p.is_file()]
+    converted, failures = cache.prepare(sources)
+    for src, error in failures:
+        print(f"⚠️  Could not convert {src}: {error}")
+    dst_imgs.mkdir(parents=True, exist_ok=True)
+    current = {p.name: p.stat().st_size for p in dst_imgs.iterdir() if p.is_file()}
+    wanted = set()
+    copied = 0
+    for src in sources:
+        name = cache.output_name(src)
+        out = converted[src]
+        size = out.stat().st_size
+        wanted.add(name)
+        # Size-only, like the rsync/robocopy mirror above.
+        if current.get(name) != size:
+            copy_engine.copy_file(out, dst_imgs / name, size, out.stat().st_mtime_ns)
+            copied += 1
+    removed = [name for name in current if name not in wanted]
+    for name in removed:
+        (dst_imgs / name).unlink()
+    print(f"🖼️  Images for {cache.profile}: {copied} copied, {len(removed)} removed ({cache.converted} newly converted)")
+
+
 # Sync for Unix (Linux/macOS)
 def sync_unix(src_path, dst_path):
     rsync_cmd = ["rsync", "-a", "--info=progress2", "--size-only", "--delete"]
     rsync_cmd += [f"--exclude={pattern}" for pattern in excludes]
+    rsync_cmd += [f"--exclude=/{folder}/" for folder in exclude_dirs]
     rsync_cmd += [f"{src_path}/", str(dst_path)]
     subprocess.run(rsync_cmd)
     sys.stdout.write("\033[F\033[K")
     print(f"✅ Sync complete: {src_path} → {dst_path}")
 
 # Main
-args = [arg for arg in sys.argv[1:] if not arg.startswith("-")]
+# --profile=miyoo-mini (or --profile miyoo-mini) downsizes Imgs for the device; --transcode-videos also re-encodes videos
+args = []
+profile = None
+argv = iter(sys.argv[1:])
+for arg in argv:
+    if arg == "--profile":
+        profile = next(argv, "")
+    elif arg.startswith("--profile="):
+        profile = arg.split("=", 1)[1]
+    elif not arg.startswith("-"):
+        args.append(arg)
+if profile is not None and profile not in media_profiles.DEVICE_PROFILES:
+    print(f"❌ Unknown device profile '{profile}' (choose from: {', '.join(sorted(media_profiles.DEVICE_PROFILES))})")
+    sys.exit(1)
 targets = args if args else sorted(system_map.keys())
+use_native = "--native" in sys.argv or not shutil.which("robocopy" if is_windows else "rsync")
+media_cache = None
+if profile:
+    media_profiles.warn_missing_tools("--transcode-videos" in sys.argv)
+    media_cache = media_profiles.MediaCache(profile, "--transcode-videos" in sys.argv)
+    exclude_dirs.append("Imgs")
+
+clean_cache = load_clean_cache()
 
 print(f"\n📂 Starting sync from {SRC} to {DST}\n")
 
@@ -113,18 +290,25 @@ for sys_name in targets:
         print("⚠️  Skipping: Source is empty or missing")
         continue
 
-    if is_windows:
+    if use_native:
+        sync_native(src_path, dst_path)
+    elif is_windows:
         sync_windows_with_progress(src_path, dst_path)
     else:
         sync_unix(src_path, dst_path)
 
-    # Rename and clean gamelist
-    gamelist = dst_path / "gamelist.xml"
+    if media_cache is not None:
+        sync_images(src_path / "Imgs", dst_path / "Imgs", media_cache)
+
+    # Write the cleaned miyoogamelist.xml from the source gamelist
+    gamelist = src_path / "gamelist.xml"
     miyoofile = dst_path / "miyoogamelist.xml"
+    copied_gamelist = dst_path / "gamelist.xml"
+    if copied_gamelist.exists():
+        copied_gamelist.unlink()
+        print(f"🗑️  Removed old copy: {copied_gamelist.name}")
     if gamelist.exists():
-        gamelist.rename(miyoofile)
-        print(f"📄 Renamed: {gamelist.name} → {miyoofile.name}")
-    if miyoofile.exists():
-        clean_xml(miyoofile)
+        clean_xml(gamelist, miyoofile, clean_cache)
 
+save_clean_cache(clean_cache)
 print("\n✅ All specified systems processed.\n")
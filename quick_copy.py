@@ -1,11 +1,21 @@
 #!/usr/bin/env python3
 
+import io
 import os
-import shutil
+import sys
+import json
+import hashlib
+import threading
+import traceback
 import subprocess
 import argparse
 import xml.etree.ElementTree as ET
-from xml.dom import minidom
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import copy_engine
+import media_profiles
 
 roms_dir = r"Y:\ES-DE\ROMs"
 media_src_base = r"Y:\ES-DE\ES-DE\downloaded_media"
@@ -15,83 +25,235 @@ media_dst_base = r"F:\\"  # Avoid raw string issue
 parser = argparse.ArgumentParser(description="Sync images, marquees, videos, and update gamelist.xml for each system.")
 parser.add_argument("--run", action="store_true", help="Perform the actual copy. Default is dry run.")
 parser.add_argument("--quiet", action="store_true", help="Suppress robocopy output (only effective with --run).")
+parser.add_argument("--referenced-only", action="store_true", help="Copy only media for ROMs present in the destination system folder instead of whole media folders.")
+parser.add_argument("--prune-media", action="store_true", help="With --referenced-only, delete destination media that no ROM on the card uses.")
+parser.add_argument("--force", action="store_true", help="Ignore the change manifest and process every system.")
+parser.add_argument("--workers", type=int, default=8, help="Parallel media copies with --referenced-only (default: 8).")
+parser.add_argument("--profile", choices=sorted(media_profiles.DEVICE_PROFILES), help="Downscale images (Pillow) to this device's screen before copying; outputs are cached.")
+parser.add_argument("--transcode-videos", action="store_true", help="With --profile, also re-encode videos to the device size with ffmpeg.")
+parser.add_argument("--jobs", type=int, default=4, help="Systems processed at once; output stays in system order (default: 4, 1 = sequential).")
 args = parser.parse_args()
 
-systems = [d for d in os.listdir(roms_dir) if os.path.isdir(os.path.join(roms_dir, d))]
-
-if not systems:
-    print("⚠️  No systems found.")
-    exit(1)
-
-def update_gamelist(gamelist_path):
-    system = os.path.basename(os.path.dirname(gamelist_path))
-    if not os.path.isfile(gamelist_path):
+GAMELIST_CHUNK = 1024 * 1024
+INDENT = "    "
+NEWLINE = os.linesep  # Matches the text-mode newlines the minidom writer produced
+
+# Gamelist tag -> destination folder and accepted extensions, preferred first
+MEDIA_TYPES = {
+    "image": ("images", (".png", ".jpg", ".jpeg", ".webp")),
+    "marquee": ("marquees", (".png", ".jpg", ".jpeg", ".webp")),
+    "video": ("videos", (".mp4", ".mkv", ".webm", ".avi")),
+}
+
+
+def xml_escape(text):
+    # Same escaping as minidom's writer, so unchanged gamelists compare byte for byte.
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace("\"", "&quot;").replace(">", "&gt;")
+
+
+def iter_gamelist(gamelist_path):
+    """Yield the <gameList> root, then each of its children as soon as it is complete."""
+    parser = ET.XMLPullParser(events=("start", "end"))
+    depth = 0
+    with open(gamelist_path, "rb") as f:
+        # ES-DE may put <alternativeEmulator> before <gameList>; start feeding at the root we want.
+        pending = b""
+        while True:
+            chunk = f.read(GAMELIST_CHUNK)
+            if not chunk:
+                raise ValueError("<gameList> section not found")
+            pending += chunk
+            index = pending.find(b"<gameList>")
+            if index != -1:
+                chunk = pending[index:]
+                break
+            pending = pending[-len(b"<gameList>"):]
+
+        while chunk:
+            parser.feed(chunk)
+            for event, elem in parser.read_events():
+                if event == "start":
+                    if depth == 0:
+                        yield elem
+                    depth += 1
+                    continue
+                depth -= 1
+                if depth == 1:
+                    yield elem
+                elif depth == 0:
+                    # Anything after </gameList> is not ours to parse.
+                    return
+            chunk = f.read(GAMELIST_CHUNK)
+        parser.close()
+
+
+def write_pretty(out, elem, depth):
+    """Write elem the way minidom.toprettyxml did, minus the whitespace-only lines."""
+    indent = INDENT * depth
+    attrs = "".join(f' {k}="{xml_escape(v)}"' for k, v in elem.attrib.items())
+    children = list(elem)
+    text = elem.text or ""
+    if not children:
+        if text:
+            out.write(f"{indent}<{elem.tag}{attrs}>{xml_escape(text)}</{elem.tag}>{NEWLINE}")
+        else:
+            out.write(f"{indent}<{elem.tag}{attrs}/>{NEWLINE}")
         return
-
+    out.write(f"{indent}<{elem.tag}{attrs}>{NEWLINE}")
+    if text.strip():
+        out.write(f"{indent}{INDENT}{xml_escape(text)}{NEWLINE}")
+    for child in children:
+        write_pretty(out, child, depth + 1)
+        if child.tail and child.tail.strip():
+            out.write(f"{indent}{INDENT}{xml_escape(child.tail)}{NEWLINE}")
+    out.write(f"{indent}</{elem.tag}>{NEWLINE}")
+
+
+class ChangedFileWriter:
+    """Compare output against the existing file as it is produced; only write once it differs."""
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.offset = 0
+        self.out = None
+        try:
+            self.existing = open(path, "rb")
+        except FileNotFoundError:
+            self.existing = None
+            self.out = open(self.tmp_path, "wb")
+
+    def write(self, text):
+        data = text.encode("utf-8")
+        if self.out is None:
+            if self.existing.read(len(data)) == data:
+                self.offset += len(data)
+                return
+            self.diverge()
+        self.out.write(data)
+
+    def diverge(self):
+        # Everything up to self.offset matched, so start the new file from the old bytes.
+        self.out = open(self.tmp_path, "wb")
+        with open(self.path, "rb") as prefix:
+            remaining = self.offset
+            while remaining:
+                block = prefix.read(min(remaining, GAMELIST_CHUNK))
+                self.out.write(block)
+                remaining -= len(block)
+
+    def close(self):
+        """Finish the file; returns True when it was rewritten."""
+        if self.out is None and self.existing.read(1):
+            self.diverge()  # The old file was longer
+        if self.existing is not None:
+            self.existing.close()
+        if self.out is None:
+            return False
+        self.out.close()
+        os.replace(self.tmp_path, self.path)
+        return True
+
+    def abort(self):
+        if self.existing is not None:
+            self.existing.close()
+        if self.out is not None:
+            self.out.close()
+            os.remove(self.tmp_path)
+
+
+def index_media_folder(folder, extensions):
+    """{basename: (file name, size, mtime_ns)} for one media folder, preferred extension first."""
+    rank = {ext: i for i, ext in enumerate(extensions)}
+    found = {}
     try:
-        with open(gamelist_path, "r", encoding="utf-8") as f:
-            content = f.read()
-
-        start = content.find("<gameList>")
-        end = content.rfind("</gameList>") + len("</gameList>")
-        if start == -1 or end == -1:
-            print(f"❌ Skipping {system}: <gameList> section not found.")
-            return
-
-        xml_snippet = content[start:end]
-        root = ET.fromstring(xml_snippet)
-        tree = ET.ElementTree(root)
-    except ET.ParseError as e:
-        print(f"❌ Skipping {system}: invalid XML — {e}")
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                stem, ext = os.path.splitext(entry.name)
+                if ext.lower() not in rank or not entry.is_file():
+                    continue
+                current = found.get(stem)
+                if current is None or rank[ext.lower()] < rank[os.path.splitext(current[0])[1].lower()]:
+                    st = entry.stat()
+                    found[stem] = (entry.name, st.st_size, st.st_mtime_ns)
+    except FileNotFoundError:
+        pass
+    return found
+
+
+def build_media_index(system_path):
+    """List each media folder once: {tag: {rom basename: file name}} using the preferred extension."""
+    return {
+        tag: {stem: found[0] for stem, found in index_media_folder(os.path.join(system_path, folder), extensions).items()}
+        for tag, (folder, extensions) in MEDIA_TYPES.items()
+    }
+
+
+def update_game_media(game, media_index, missing):
+    path_elem = game.find("path")
+    if path_elem is None or not path_elem.text:
+        return
+
+    rom_filename = os.path.basename(path_elem.text.strip())
+    rom_basename = os.path.splitext(rom_filename)[0]
+
+    def set_or_replace(tag, value):
+        tag_elem = game.find(tag)
+        if tag_elem is None:
+            tag_elem = ET.SubElement(game, tag)
+        tag_elem.text = value
+
+    # Point each tag at the file that exists, or the default extension when none does
+    for tag, (folder, extensions) in MEDIA_TYPES.items():
+        filename = media_index[tag].get(rom_basename)
+        if filename is None:
+            media_rel = f"./{folder}/{rom_basename}{extensions[0]}"
+            missing[tag].append(media_rel)
+        else:
+            media_rel = f"./{folder}/{filename}"
+        set_or_replace(tag, media_rel)
+
+
+def update_gamelist(gamelist_path, output_path=None):
+    """Stream gamelist_path into output_path (default: in place) with media tags set.
+
+    Memory stays at one <game> at a time, and the output file is left untouched
+    when the result is identical to what is already there.
+    """
+    output_path = output_path or gamelist_path
+    system = os.path.basename(os.path.dirname(output_path))
+    if not os.path.isfile(gamelist_path):
         return
 
     # Track missing media files
     missing = {"image": [], "marquee": [], "video": []}
 
-    system_path = os.path.dirname(gamelist_path)
-
-    for game in root.findall("game"):
-        path_elem = game.find("path")
-        if path_elem is None or not path_elem.text:
-            continue
-
-        rom_filename = os.path.basename(path_elem.text.strip())
-        rom_basename = os.path.splitext(rom_filename)[0]
-
-        def set_or_replace(tag, value):
-            tag_elem = game.find(tag)
-            if tag_elem is None:
-                tag_elem = ET.SubElement(game, tag)
-            tag_elem.text = value
-
-        # Build media paths
-        image_rel = f"./images/{rom_basename}.png"
-        video_rel = f"./videos/{rom_basename}.mp4"
-        marquee_rel = f"./marquees/{rom_basename}.png"
-
-        # Update XML
-        set_or_replace("image", image_rel)
-        set_or_replace("marquee", marquee_rel)
-        set_or_replace("video", video_rel)
-
-        # Check file existence
-        if not os.path.isfile(os.path.join(system_path, image_rel[2:])):
-            missing["image"].append(image_rel)
-        if not os.path.isfile(os.path.join(system_path, marquee_rel[2:])):
-            missing["marquee"].append(marquee_rel)
-        if not os.path.isfile(os.path.join(system_path, video_rel[2:])):
-            missing["video"].append(video_rel)
-
-    # Format and save XML
-    rough_string = ET.tostring(root, encoding="utf-8")
-    reparsed = minidom.parseString(rough_string)
-    pretty_xml = reparsed.toprettyxml(indent="    ")
-    cleaned_xml = "\n".join(line for line in pretty_xml.splitlines() if line.strip())
-
-    with open(gamelist_path, "w", encoding="utf-8") as f:
-        f.write(cleaned_xml)
+    media_index = build_media_index(os.path.dirname(output_path))
+    out = ChangedFileWriter(output_path)
+    try:
+        games = iter_gamelist(gamelist_path)
+        root = next(games)
+        attrs = "".join(f' {k}="{xml_escape(v)}"' for k, v in root.attrib.items())
+        out.write(f'<?xml version="1.0" ?>{NEWLINE}<{root.tag}{attrs}>{NEWLINE}')
+        for elem in games:
+            if elem.tag == "game":
+                update_game_media(elem, media_index, missing)
+            write_pretty(out, elem, 1)
+            # Drop the finished element so only one <game> is ever held in memory.
+            root.remove(elem)
+        out.write(f"</{root.tag}>")
+    except (ET.ParseError, ValueError) as e:
+        out.abort()
+        print(f"❌ Skipping {system}: invalid XML — {e}")
+        return
+    except BaseException:
+        out.abort()
+        raise
 
-    print(f"📝 Updated gamelist.xml for {system}")
+    if out.close():
+        print(f"📝 Updated gamelist.xml for {system}")
+    else:
+        print(f"✅ gamelist.xml already up to date for {system}")
 
     # Report missing files
     total_missing = sum(len(v) for v in missing.values())
@@ -104,64 +266,345 @@ def update_gamelist(gamelist_path):
                     print(f"    - {path}")
 
 
-for system in sorted(systems):
+def list_rom_basenames(dest_system_folder):
+    """Basenames of the ROMs (files or folders) on the card, ignoring media folders and the gamelist."""
+    media_folders = {folder for folder, _ in MEDIA_TYPES.values()}
+    names = set()
+    with os.scandir(dest_system_folder) as entries:
+        for entry in entries:
+            if entry.name in media_folders or entry.name.lower() == "gamelist.xml" or entry.name.startswith("."):
+                continue
+            names.add(os.path.splitext(entry.name)[0] if entry.is_file() else entry.name)
+    return names
+
+
+def sync_media(system, dest_system_folder, media_folders):
+    """Copy media in parallel: only what ROMs on the card use with --referenced-only, device-sized with --profile."""
+    roms = list_rom_basenames(dest_system_folder) if args.referenced_only else None
+    plans = []
+    stale = []
+    for label, tag, src_folder, dst_folder in media_folders:
+        extensions = MEDIA_TYPES[tag][1]
+        src_index = index_media_folder(src_folder, extensions)
+        wanted = {stem: src_index[stem] for stem in (src_index if roms is None else roms) if stem in src_index}
+        plans.append((src_folder, dst_folder, wanted, index_media_folder(dst_folder, extensions)))
+
+    # Swap each source for its device-sized version; conversions run once and are cached.
+    converted = {}
+    if media_cache is not None:
+        sources = [os.path.join(src_folder, found[0]) for src_folder, _, wanted, _ in plans for found in wanted.values()]
+        if args.run:
+            converted, failures = media_cache.prepare(sources)
+            for src, error in failures:
+                print(f"⚠️  Could not convert {src}: {error}")
+        else:
+            converted = {src: media_cache.lookup(src) for src in sources}
+
+    copies = []
+    for src_folder, dst_folder, wanted, dst_index in plans:
+        names = set()
+        for stem, (name, size, mtime_ns) in wanted.items():
+            source = os.path.join(src_folder, name)
+            if media_cache is not None:
+                name = media_cache.output_name(Path(name))
+                cached = converted.get(source)
+                if cached is not None:
+                    source = str(cached)
+                    st = os.stat(source)
+                    size, mtime_ns = st.st_size, st.st_mtime_ns
+            names.add(name)
+            current = dst_index.get(stem)
+            if current is None or current[0] != name or current[1] != size or abs(current[2] - mtime_ns) > copy_engine.MTIME_WINDOW * 1_000_000_000:
+                copies.append((source, os.path.join(dst_folder, name), size, mtime_ns))
+        if roms is not None:
+            try:
+                with os.scandir(dst_folder) as entries:
+                    stale.extend(entry.path for entry in entries if entry.is_file() and entry.name not in names)
+            except FileNotFoundError:
+                pass
+
+    total_bytes = sum(c[2] for c in copies)
+    what = "referenced media files" if roms is not None else "media files"
+    sized = f" sized for {args.profile}" if media_cache is not None else ""
+    print(f"📁 {'[DRY RUN] ' if not args.run else ''}Copying {len(copies)} {what}{sized} "
+          f"({total_bytes / 1024 / 1024:.1f} MB)" + (f" for {len(roms)} ROMs" if roms is not None else "") + f" in: {system}")
+    if args.run and copies:
+        for folder in {os.path.dirname(c[1]) for c in copies}:
+            os.makedirs(folder, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            for _ in pool.map(lambda c: copy_engine.copy_file(Path(c[0]), Path(c[1]), c[2], c[3]), copies):
+                pass
+
+    if stale:
+        if args.prune_media and args.run:
+            for path in stale:
+                os.remove(path)
+            print(f"🧹 Removed {len(stale)} media files with no ROM on the card in: {system}")
+        else:
+            print(f"🗑️  {len(stale)} media files with no ROM on the card in: {system}" +
+                  ("" if args.prune_media else " (use --prune-media to remove)"))
+            if not args.quiet:
+                for path in sorted(stale):
+                    print(f"    - {os.path.relpath(path, dest_system_folder)}")
+
+
+MANIFEST_NAME = ".quick_copy_manifest.json"
+
+
+def file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(GAMELIST_CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stat_key(path):
+    try:
+        st = os.stat(path)
+        return [st.st_size, st.st_mtime_ns]
+    except FileNotFoundError:
+        return None
+
+
+def folder_fingerprint(path):
+    """[file count, total bytes, newest mtime] from one listing; changes when anything is added, replaced or removed."""
+    count = total = newest = 0
     try:
-        print(f"\n🔎 Processing: {system}")
-        dest_system_folder = os.path.join(media_dst_base, system)
-        if not os.path.isdir(dest_system_folder):
-            print(f"⚠️  Skipping '{system}' — destination folder does not exist.")
-            continue
-
-        # Define source folders
-        miximages_src = os.path.join(media_src_base, system, "miximages")
-        videos_src = os.path.join(media_src_base, system, "videos")
-        marquees_src = os.path.join(media_src_base, system, "marquees")
-
-        # Define destination folders
-        images_dst = os.path.join(dest_system_folder, "images")
-        videos_dst = os.path.join(dest_system_folder, "videos")
-        marquees_dst = os.path.join(dest_system_folder, "marquees")
-
-        # Copy gamelist.xml
-        gamelist_src = os.path.join(gamelist_src_base, system, "gamelist.xml")
-        gamelist_dst = os.path.join(dest_system_folder, "gamelist.xml")
-
-        if os.path.isfile(gamelist_src):
-            print(f"📄 Copying gamelist.xml for: {system}")
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    st = entry.stat()
+                    count += 1
+                    total += st.st_size
+                    newest = max(newest, st.st_mtime_ns)
+    except FileNotFoundError:
+        return None
+    return [count, total, newest]
+
+
+def load_manifest():
+    try:
+        with open(os.path.join(media_dst_base, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest):
+    path = os.path.join(media_dst_base, MANIFEST_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+def output_matches(previous, gamelist_dst):
+    """The card's gamelist is still the one we wrote: same stat, or same bytes if only the stat moved."""
+    current = stat_key(gamelist_dst)
+    if current is None or previous.get("output") is None:
+        return current == previous.get("output")
+    return current == previous["output"] or file_digest(gamelist_dst) == previous.get("output_hash")
+
+
+def gamelist_inputs(gamelist_src, dest_system_folder, previous):
+    """What the rewritten gamelist depends on: the source gamelist and the media on the card."""
+    source_stat = stat_key(gamelist_src)
+    # Only re-hash the source gamelist when its size or mtime moved.
+    if previous and previous.get("source_stat") == source_stat:
+        source_hash = previous.get("source_hash")
+    else:
+        source_hash = file_digest(gamelist_src) if source_stat else None
+    return {
+        "source_stat": source_stat,
+        "source_hash": source_hash,
+        "media": {folder: folder_fingerprint(os.path.join(dest_system_folder, folder)) for folder, _ in MEDIA_TYPES.values()},
+    }
+
+
+def system_inputs(media_folders, dest_system_folder, gamelist):
+    roms = sorted(list_rom_basenames(dest_system_folder)) if args.referenced_only else []
+    return {
+        "gamelist": gamelist,
+        "media_src": {label: folder_fingerprint(src) for label, src, _ in media_folders},
+        "roms": hashlib.sha1("\n".join(roms).encode("utf-8")).hexdigest(),
+        "referenced_only": args.referenced_only,
+        "profile": [args.profile, args.transcode_videos] if args.profile else None,
+    }
+
+
+def process_system(system, manifest):
+    print(f"\n🔎 Processing: {system}")
+    dest_system_folder = os.path.join(media_dst_base, system)
+    if not os.path.isdir(dest_system_folder):
+        print(f"⚠️  Skipping '{system}' — destination folder does not exist.")
+        return
+
+    # Define source folders
+    miximages_src = os.path.join(media_src_base, system, "miximages")
+    videos_src = os.path.join(media_src_base, system, "videos")
+    marquees_src = os.path.join(media_src_base, system, "marquees")
+
+    # Define destination folders
+    images_dst = os.path.join(dest_system_folder, "images")
+    videos_dst = os.path.join(dest_system_folder, "videos")
+    marquees_dst = os.path.join(dest_system_folder, "marquees")
+
+    media_folders = [
+        ("miximages → images", miximages_src, images_dst),
+        ("videos", videos_src, videos_dst),
+        ("marquees", marquees_src, marquees_dst),
+    ]
+
+    # Copy gamelist.xml
+    gamelist_src = os.path.join(gamelist_src_base, system, "gamelist.xml")
+    gamelist_dst = os.path.join(dest_system_folder, "gamelist.xml")
+
+    # Nothing changed on either side since the last run: skip without copying or parsing.
+    previous = {} if args.force else manifest.get(system, {})
+    gamelist = gamelist_inputs(gamelist_src, dest_system_folder, previous.get("inputs", {}).get("gamelist"))
+    inputs = system_inputs(media_folders, dest_system_folder, gamelist)
+    if previous.get("inputs") == inputs and output_matches(previous, gamelist_dst):
+        print(f"⏭️  Unchanged since last run: {system}")
+        return
+
+    # The gamelist is written by update_gamelist below, straight from the source copy.
+    if os.path.isfile(gamelist_src):
+        print(f"📄 Copying gamelist.xml for: {system}")
+
+    if args.referenced_only or media_cache is not None:
+        sync_media(system, dest_system_folder, [
+            ("miximages → images", "image", miximages_src, images_dst),
+            ("videos", "video", videos_src, videos_dst),
+            ("marquees", "marquee", marquees_src, marquees_dst),
+        ])
+
+    # Robocopy media folders
+    for label, src_folder, dst_folder in [] if args.referenced_only or media_cache is not None else media_folders:
+        if os.path.isdir(src_folder):
+            print(f"📁 {'[DRY RUN] ' if not args.run else ''}Copying {label} for: {system}")
             if args.run:
-                shutil.copy2(gamelist_src, gamelist_dst)
-
-        # Robocopy media folders
-        for label, src_folder, dst_folder in [
-            ("miximages → images", miximages_src, images_dst),
-            ("videos", videos_src, videos_dst),
-            ("marquees", marquees_src, marquees_dst),
-        ]:
-            if os.path.isdir(src_folder):
-                print(f"📁 {'[DRY RUN] ' if not args.run else ''}Copying {label} for: {system}")
-                if args.run:
-                    robocopy_cmd = [
-                        "robocopy",
-                        src_folder,
-                        dst_folder,
-                        "/E",     # Copy all subdirectories, including empty ones
-                        "/NJH",   # No job header
-                        "/NP",    # Suppress progress per file
-                    ]
-                    if args.quiet:
-                        subprocess.run(robocopy_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                    else:
-                        subprocess.run(robocopy_cmd, capture_output=False, text=True)
-
-
-        # Update gamelist.xml with media tags
-        if args.run and os.path.isfile(gamelist_dst):
-            update_gamelist(gamelist_dst)
+                # Captured rather than inherited so it lands in this system's buffered log.
+                robocopy_cmd = [
+                    "robocopy",
+                    src_folder,
+                    dst_folder,
+                    "/E",     # Copy all subdirectories, including empty ones
+                    "/NJH",   # No job header
+                    "/NP",    # Suppress progress per file
+                ]
+                if args.quiet:
+                    subprocess.run(robocopy_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                else:
+                    result = subprocess.run(robocopy_cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+                    print(result.stdout, end="")
+
+    if not args.run:
+        return
+
+    # Write gamelist.xml with media tags, unless neither the source nor the card's media moved.
+    gamelist = gamelist_inputs(gamelist_src, dest_system_folder, gamelist)
+    previous_gamelist = previous.get("inputs", {}).get("gamelist")
+    if os.path.isfile(gamelist_src):
+        if gamelist == previous_gamelist and output_matches(previous, gamelist_dst):
+            print(f"✅ gamelist.xml inputs unchanged for {system}")
+        else:
+            if xml_pool is not None:
+                print(xml_pool.submit(update_gamelist_captured, gamelist_src, gamelist_dst).result(), end="")
+            else:
+                update_gamelist(gamelist_src, gamelist_dst)
+
+    entry = {
+        "inputs": system_inputs(media_folders, dest_system_folder, gamelist),
+        "output": stat_key(gamelist_dst),
+        "output_hash": file_digest(gamelist_dst) if os.path.isfile(gamelist_dst) else None,
+    }
+    with manifest_lock:
+        manifest[system] = entry
+        save_manifest(manifest)
+
+
+# ========= PARALLEL RUN =========
+
+manifest_lock = threading.Lock()
+xml_pool = None  # Set in main() when gamelists are rewritten in worker processes
+media_cache = None  # Set in main() when --profile is given
 
+
+class SystemLog:
+    """Stand-in for sys.stdout that sends each worker thread's prints to its own buffer."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self.local, "buffer", None)
+        return (buffer or self.stream).write(text)
+
+    def flush(self):
+        if getattr(self.local, "buffer", None) is None:
+            self.stream.flush()
+
+
+def update_gamelist_captured(gamelist_src, gamelist_dst):
+    """Process-pool entry point: the XML rewrite is CPU-bound, so it runs outside the GIL."""
+    output = io.StringIO()
+    with redirect_stdout(output):
+        update_gamelist(gamelist_src, gamelist_dst)
+    return output.getvalue()
+
+
+def run_system(system, manifest):
+    try:
+        process_system(system, manifest)
     except Exception as e:
         print(f"💥 Exception while processing {system}: {e}")
-        import traceback
-        traceback.print_exc()
+        traceback.print_exc(file=sys.stdout)
 
-if not args.run:
-    print("\nℹ️  Dry run complete. Use `--run` to perform the actual copy.")
+
+def run_system_buffered(log, system, manifest):
+    log.local.buffer = io.StringIO()
+    try:
+        run_system(system, manifest)
+        return log.local.buffer.getvalue()
+    finally:
+        log.local.buffer = None
+
+
+def main():
+    global xml_pool, media_cache
+    if args.profile:
+        media_profiles.warn_missing_tools(args.transcode_videos)
+        media_cache = media_profiles.MediaCache(args.profile, args.transcode_videos, args.workers)
+
+    systems = [d for d in os.listdir(roms_dir) if os.path.isdir(os.path.join(roms_dir, d))]
+
+    if not systems:
+        print("⚠️  No systems found.")
+        exit(1)
+
+    manifest = load_manifest()
+    if args.jobs <= 1:
+        for system in sorted(systems):
+            run_system(system, manifest)
+    else:
+        # Copies run in threads; each system's output is printed whole, in order, once it and
+        # every system before it has finished.
+        log = SystemLog(sys.stdout)
+        sys.stdout = log
+        try:
+            with ProcessPoolExecutor(max_workers=args.jobs) as xml_pool, ThreadPoolExecutor(max_workers=args.jobs) as pool:
+                futures = [pool.submit(run_system_buffered, log, system, manifest) for system in sorted(systems)]
+                for future in futures:
+                    log.stream.write(future.result())
+                    log.stream.flush()
+        finally:
+            sys.stdout = log.stream
+            xml_pool = None
+
+    if not args.run:
+        print("\nℹ️  Dry run complete. Use `--run` to perform the actual copy.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,20 @@
 #!/usr/bin/env python3
 
+import os
+import json
 import platform
 import subprocess
 import sys
 import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from argparse import ArgumentParser, Action
 
+import copy_engine
+
 # ========= USER CONFIGURATION =========
 
 # Windows
@@ -48,6 +56,14 @@ parser.add_argument("--DST", type=str, help=f"Destination override (default: {'D
 parser.add_argument("--exclude", action=CollectExclude, help="Exclude path (e.g., Imgs, *.pdf, psx/BadGame.chd)")
 parser.add_argument("--systems", type=str, help="Comma-separated list of subfolders (systems) to sync (e.g., snes,psx,nes)")
 parser.add_argument("--create-folders", action="store_true", help="Create destination subfolders if they don't exist")
+parser.add_argument("--jobs", type=int, default=4, help="Number of systems synced at once (default: 4, 1 = one after another with full output)")
+parser.add_argument("--no-plan", action="store_true", help="Skip the pre-flight scan of source and destination")
+parser.add_argument("--plan-only", action="store_true", help="Print the transfer plan and exit without syncing")
+parser.add_argument("--on-full", choices=["refuse", "trim"], default="refuse", help="When the plan does not fit on the destination: refuse the run (default) or drop systems until it fits")
+parser.add_argument("--report", type=str, default="sync_report.json", help="Where to write per-file changes and per-system timings as JSON (default: sync_report.json)")
+parser.add_argument("--engine", choices=["auto", "tool", "native"], default="auto", help="Copy with robocopy/rsync (tool), the built-in engine (native), or the tool when installed (auto, default)")
+parser.add_argument("--workers", type=int, default=4, help="Parallel file copies per system for the native engine (default: 4)")
+parser.add_argument("--per-device", type=int, default=2, help="Max concurrent syncs reading or writing the same disk (default: 2)")
 args = parser.parse_args()
 
 dry_run = args.dry_run
@@ -55,6 +71,9 @@ dry_run = args.dry_run
 if dry_run:
     args.mirror = True
 verbose_mode = args.verbose
+# Interleaved full tool output is unreadable, so --verbose keeps the sequential run.
+jobs = 1 if verbose_mode else max(1, args.jobs)
+use_native = args.engine == "native" or (args.engine == "auto" and not shutil.which("robocopy" if is_windows else "rsync"))
 selected_systems = [s.strip().lower() for s in args.systems.split(',')] if args.systems else None
 
 if not args.roms and not args.es_de:
@@ -84,12 +103,43 @@ highlight_re = re.compile(r'^\s*(?P<type>\*EXTRA Dir|\*EXTRA File|Newer|New File
 progress_re = re.compile(r'^\s*(\d{1,3}(\.\d+)?%)\s*$')
 INDENT = " " * 8
 
-summary = {"synced": [], "skipped_filtered": [], "skipped_missing_dst": [], "missing_src": [], "extras": {}}
+summary = {"synced": [], "failed": [], "skipped_filtered": [], "skipped_missing_dst": [], "skipped_no_space": [], "missing_src": [], "extras": {}, "stats": {}}
+summary_lock = threading.Lock()
+running_processes = set()
+rsync_progress_re = re.compile(r'(\d{1,3})%')
+# Matches the --out-format below: itemize string, file length, path.
+rsync_record_re = re.compile(r'^(?P<item>[^|]{9,11})\|(?P<size>-?\d*)\|(?P<path>.+)$')
+RSYNC_OUT_FORMAT = "--out-format=%i|%l|%n"
+ROBOCOPY_ACTIONS = {"New File": "add", "Newer": "update", "Older": "update", "New Dir": "mkdir"}
+COPY_ACTIONS = ("add", "update")
+ROBOCOPY_FAILURE = 8  # robocopy exit codes 8 and up mean some copies failed
+
+class SyncError(Exception):
+    """A sync tool exited with an error; output holds the lines it printed that were not file records."""
+
+    def __init__(self, message, output=()):
+        super().__init__(message)
+        self.output = list(output)
+
+def change_record(action, size, path):
+    return {"action": action, "size": size, "path": path}
+
+def rsync_action(item):
+    """Map an rsync --itemize-changes string to add/update/delete/mkdir, or None for attribute-only changes."""
+    item = item.strip()
+    if item.startswith("*deleting"):
+        return "delete"
+    if item[0] in "<>":
+        return "add" if "+++" in item else "update"
+    if item[0] == "c":
+        return "mkdir" if item[1] == "d" else "add"
+    return None
 
 def format_highlight_line(match: re.Match, prefix: str) -> str:
     if match.group('type'):
         type_ = match.group('type')
         size = match.group('size').strip()
+        size = format_bytes(int(size)) if size.isdigit() else size
         filename = match.group('filename')
         return f"{prefix}{type_:<12} {size:>8}  {filename}"
     else:
@@ -107,9 +157,16 @@ def normalize_excludes(excludes):
         normalized.append(str(ex))
     return normalized
 
-def sync_with_robocopy(src: Path, dst: Path, excludes):
+def robocopy_relative(path, root):
+    """robocopy prints absolute Windows folders; keep records relative to the system folder like rsync's."""
+    root = str(root).replace("/", "\\").rstrip("\\")
+    if not path.lower().startswith(root.lower()):
+        return ""
+    return path[len(root):].strip("\\/").replace("\\", "/")
+
+def sync_with_robocopy(src: Path, dst: Path, excludes, report=None):
     delete_flag = "/MIR" if args.mirror else "/E"
-    cmd = ["robocopy", str(src), str(dst), delete_flag, "/FFT", "/NJH", "/NJS"]
+    cmd = ["robocopy", str(src), str(dst), delete_flag, "/FFT", "/NJH", "/NJS", "/BYTES"]
 
     for ex in excludes:
         path = Path(ex)
@@ -123,13 +180,18 @@ def sync_with_robocopy(src: Path, dst: Path, excludes):
 
     if dry_run:
         cmd.append("/L")
-        print(f"🔎 [Dry run] robocopy: {src} → {dst}", end="\r")
+        if not report:
+            print(f"🔎 [Dry run] robocopy: {src} → {dst}", end="\r")
     elif verbose_mode:
         cmd = [p for p in cmd if p not in ["/NJH", "/NJS", "/NP"]]
 
     process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    running_processes.add(process)
     last_length = 0
     extra_lines = []
+    records = []
+    output = []
+    current_dir = ""
 
     try:
         for line in process.stdout:
@@ -144,11 +206,35 @@ def sync_with_robocopy(src: Path, dst: Path, excludes):
             match = highlight_re.match(clean_line)
             progress = progress_re.match(clean_line)
 
-            if match:
-                output = format_highlight_line(match, INDENT)
+            if match and match.group('path'):
+                current_dir = robocopy_relative(match.group('path'), src)
+            elif match:
+                type_ = match.group('type')
+                action = ROBOCOPY_ACTIONS.get(type_) or ("delete" if args.mirror else "extra")
+                size = match.group('size').strip()
+                filename = match.group('filename').strip()
+                if type_.endswith("Dir"):
+                    # "New Dir  <count>  <path>" doubles as the header for the files copied into it;
+                    # extra folders are listed with their destination path.
+                    current_dir = robocopy_relative(filename, dst if type_.startswith("*EXTRA") else src)
+                    records.append(change_record(action, None, current_dir))
+                else:
+                    path = f"{current_dir}/{filename}" if current_dir else filename
+                    records.append(change_record(action, int(size) if size.isdigit() else None, path))
+
+            if report:
+                if match and match.group('type'):
+                    report(src.name, match.group('filename').strip())
+                elif progress:
+                    report(src.name, progress.group(1))
+                elif not match and clean_line.strip():
+                    # Errors and warnings are kept for the system's finish message.
+                    output.append(clean_line.strip())
+            elif match:
+                line_out = format_highlight_line(match, INDENT)
                 print("\r" + " " * last_length, end="\r")
-                print(output, end="\r")
-                last_length = len(output)
+                print(line_out, end="\r")
+                last_length = len(line_out)
             elif progress:
                 print(f"\r{progress.group(1)}", end="", flush=True)
             else:
@@ -160,33 +246,77 @@ def sync_with_robocopy(src: Path, dst: Path, excludes):
     except KeyboardInterrupt:
         process.terminate()
         print("\n⛔ Interrupted.",end="")
-        return
+        return records, output
 
     process.wait()
-    summary["extras"][src.name] = extra_lines
+    running_processes.discard(process)
+    with summary_lock:
+        summary["extras"][src.name] = extra_lines
+    if process.returncode >= ROBOCOPY_FAILURE:
+        if not report:
+            print("\r" + " " * last_length, end="\r", flush=True)
+        raise SyncError(f"robocopy exited with code {process.returncode}", output)
+    if report:
+        return records, output
     final_status = f"✅ {'Simulated' if dry_run else 'Synced'}: {src} → {dst}"
     print("\r" + " " * last_length, end="\r", flush=True)
     print(final_status, end="")
+    return records, output
 
 
-def sync_with_rsync(src: Path, dst: Path, excludes):
+def sync_with_rsync(src: Path, dst: Path, excludes, report=None):
     delete_flag = "--delete" if args.mirror else None
-    cmd = ["rsync", "-a", f"{src}/", f"{dst}/"]
+    cmd = ["rsync", "-a", RSYNC_OUT_FORMAT, f"{src}/", f"{dst}/"]
     if delete_flag:
         cmd.insert(2, delete_flag)
     if dry_run:
         cmd.insert(1, "--dry-run")
-        print(f"🔎 [Dry run] rsync: {src} → {dst}", end="\r")
+        if not report:
+            print(f"🔎 [Dry run] rsync: {src} → {dst}", end="\r")
     else:
         cmd.insert(1, "--info=progress2")
 
     for ex in excludes:
         cmd.insert(1, f"--exclude={ex}")
 
-    subprocess.run(cmd)
+    # progress2 redraws one line with \r, so split on both line endings.
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    running_processes.add(process)
+    records = []
+    output = []
+    pending = b""
+    for chunk in iter(lambda: process.stdout.read1(4096), b""):
+        *lines, pending = re.split(rb"[\r\n]", pending + chunk)
+        for raw in lines:
+            line = raw.decode(errors="replace")
+            record = rsync_record_re.match(line)
+            if record:
+                action = rsync_action(record.group('item'))
+                if action:
+                    size = record.group('size')
+                    records.append(change_record(action, int(size) if size.isdigit() else None, record.group('path')))
+                if verbose_mode:
+                    print(line)
+                continue
+            progress = rsync_progress_re.search(line)
+            if report:
+                if progress:
+                    report(src.name, f"{progress.group(1)}%")
+                elif line.strip():
+                    # Errors and warnings are kept for the system's finish message.
+                    output.append(line.strip())
+            elif progress:
+                print(f"\r{line}", end="", flush=True)
+            elif line.strip():
+                print(line)
+    process.wait()
+    running_processes.discard(process)
+    if process.returncode != 0:
+        raise SyncError(f"rsync exited with code {process.returncode}", output)
+    return records, output
 
 def sync_folder(src: Path, dst: Path, rel_excludes):
-
+    """Print the run header for one target and return the (src, dst, excludes) jobs it contains."""
     print(f"\n📁 Syncing subfolders of: {src} → {dst}")
     print("🔍 Exclusions (relative to each system folder):")
     for e in rel_excludes:
@@ -194,6 +324,7 @@ def sync_folder(src: Path, dst: Path, rel_excludes):
     if selected_systems:
         print(f"📦 Filtering systems: {', '.join(selected_systems)}")
 
+    work = []
     for sub in sorted(src.iterdir()):
         if not sub.is_dir():
             continue
@@ -212,13 +343,317 @@ def sync_folder(src: Path, dst: Path, rel_excludes):
                 continue
 
         excludes = [e for e in rel_excludes if Path(e).parts[0].lower() in [sub.name.lower(), '*'] or Path(e).name == e]
+        work.append((sub, target_dst, excludes))
+    return work
+
+def sync_with_native(src: Path, dst: Path, excludes, report=None):
+    if dry_run and not report:
+        print(f"🔎 [Dry run] native: {src} → {dst}", end="\r")
+    if report:
+        progress = lambda text: report(src.name, text)
+    else:
+        progress = lambda text: print(f"\r{text}", end="", flush=True)
+    records = copy_engine.sync_tree(src, dst, mirror=args.mirror, excludes=[Path(e).name for e in excludes],
+                                    workers=args.workers, dry_run=dry_run, progress=progress)
+    extra_lines = [f"*EXTRA File  {r['path']}" for r in records if r["action"] in ("delete", "extra")]
+    with summary_lock:
+        summary["extras"][src.name] = extra_lines
+    if not report:
+        print(f"\r✅ {'Simulated' if dry_run else 'Synced'}: {src} → {dst}", end="")
+    return records, []
+
+def sync_system(src: Path, dst: Path, excludes, report=None):
+    """Sync one system; returns the tool's non-record output, or raises SyncError when it failed."""
+    started = time.monotonic()
+    try:
+        if use_native:
+            records, output = sync_with_native(src, dst, excludes, report)
+        elif is_windows:
+            records, output = sync_with_robocopy(src, dst, excludes, report)
+        else:
+            records, output = sync_with_rsync(src, dst, excludes, report)
+    except Exception:
+        with summary_lock:
+            summary["failed"].append(src.name)
+        raise
+    record_stats(src.name, records, time.monotonic() - started)
+    with summary_lock:
+        summary["synced"].append(src.name)
+    return output
+
+def format_failure(system, error):
+    return f"❌ {system}: {error}" + "".join(f"\n{INDENT}{line}" for line in getattr(error, "output", []))
+
+def record_stats(system, records, duration):
+    copied = [r for r in records if r["action"] in COPY_ACTIONS]
+    copied_bytes = sum(r["size"] or 0 for r in copied)
+    with summary_lock:
+        summary["stats"][system] = {
+            "duration_s": round(duration, 2),
+            "copied_files": len(copied),
+            "copied_bytes": copied_bytes,
+            "deleted": sum(r["action"] == "delete" for r in records),
+            "bytes_per_s": round(copied_bytes / duration) if duration > 0 else 0,
+            "changes": records,
+        }
+
+def write_report(path):
+    """Write per-system timings and change records as JSON, atomically."""
+    report = {
+        "finished": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "dry_run": dry_run,
+        "mirror": args.mirror,
+        "systems": summary["stats"],
+        "failed": summary["failed"],
+        "skipped": {k: summary[k] for k in ("skipped_filtered", "skipped_missing_dst", "skipped_no_space")},
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    os.replace(tmp_path, path)
+
+# ========= SCHEDULER =========
+
+def estimate_size(path: Path) -> int:
+    """Total bytes under path; used only to order the work, so unreadable entries count as zero."""
+    total = 0
+    stack = [str(path)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        total += entry.stat().st_size
+        except OSError:
+            pass
+    return total
+
+def device_key(path: Path):
+    """Identify the disk behind path: the drive letter on Windows, st_dev elsewhere."""
+    if is_windows:
+        return path.drive.upper() or str(path)
+    while not path.exists():
+        path = path.parent
+    return os.stat(path).st_dev
+
+class ProgressDisplay:
+    """One status line covering every running sync, with finished systems printed above it."""
+
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.status = {}
+        self.lock = threading.Lock()
+        self.last_length = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self, system):
+        with self.lock:
+            self.status[system] = "starting"
+
+    def report(self, system, text):
+        with self.lock:
+            if system in self.status:
+                self.status[system] = text
+
+    def finish(self, message, system=None):
+        with self.lock:
+            self.status.pop(system, None)
+            if system is not None:
+                self.done += 1
+            self.clear()
+            print(message, flush=True)
+
+    def clear(self):
+        if self.last_length:
+            print("\r" + " " * self.last_length, end="\r")
+            self.last_length = 0
+
+    def draw(self):
+        with self.lock:
+            width = shutil.get_terminal_size().columns - 1
+            running = " | ".join(f"{name} {text}" for name, text in self.status.items())
+            line = f"⏳ [{self.done}/{self.total}] {running}"[:width]
+            self.clear()
+            print(line, end="\r", flush=True)
+            self.last_length = len(line)
+
+    def run(self):
+        while not self.stop_event.wait(0.5):
+            self.draw()
+
+    def close(self):
+        self.stop_event.set()
+        self.thread.join()
+        with self.lock:
+            self.clear()
+
+def run_sync_jobs(work, sizes=None):
+    """Run system syncs concurrently, largest first, with at most --per-device streams on any disk."""
+    if jobs == 1 or len(work) <= 1:
+        for src, dst, excludes in work:
+            try:
+                sync_system(src, dst, excludes)
+            except Exception as e:
+                # Same as the parallel path: one failed system must not lose the summary and report.
+                print("\n" + format_failure(src.name, e))
+        return
 
-        if is_windows:
-            sync_with_robocopy(sub, target_dst, excludes)
+    # Largest systems start first so the small ones fill in around them (LPT ordering).
+    if sizes is None:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            sizes = dict(zip((w[0] for w in work), pool.map(lambda w: estimate_size(w[0]), work)))
+    work = sorted(work, key=lambda w: sizes[w[0]], reverse=True)
+
+    device_slots = {}
+    for src, dst, _ in work:
+        for key in (device_key(src), device_key(dst)):
+            device_slots.setdefault(key, threading.BoundedSemaphore(max(1, args.per_device)))
+
+    display = ProgressDisplay(len(work))
+    verb = "Simulated" if dry_run else "Synced"
+
+    def run_one(src, dst, excludes):
+        # Acquire in a fixed order so two jobs sharing both disks cannot deadlock.
+        slots = [device_slots[k] for k in sorted({device_key(src), device_key(dst)}, key=str)]
+        for slot in slots:
+            slot.acquire()
+        try:
+            display.start(src.name)
+            started = time.monotonic()
+            output = sync_system(src, dst, excludes, display.report)
+            display.finish(f"✅ {verb}: {src} → {dst} ({time.monotonic() - started:.0f}s)"
+                           + "".join(f"\n{INDENT}{line}" for line in output), src.name)
+        finally:
+            for slot in reversed(slots):
+                slot.release()
+
+    print(f"\n🚀 Running {len(work)} systems, up to {jobs} at once ({args.per_device} per disk)")
+    display.thread.start()
+    pool = ThreadPoolExecutor(max_workers=jobs)
+    try:
+        futures = {pool.submit(run_one, *w): w[0] for w in work}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                display.finish(format_failure(futures[future].name, e), futures[future].name)
+    except KeyboardInterrupt:
+        # Drop queued systems and stop the running tools instead of waiting for them.
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in list(running_processes):
+            process.terminate()
+        display.finish("\n⛔ Interrupted.")
+        raise
+    finally:
+        pool.shutdown(wait=True)
+        display.close()
+
+# ========= PRE-FLIGHT PLAN =========
+
+def scan_tree(root: Path, excludes):
+    """Map relative file paths under root to (size, mtime_ns) with the native engine's scanner and exclude rules."""
+    files, _ = copy_engine.scan(root, [Path(e).name for e in excludes])
+    return files
+
+def plan_system(src_files, dst_files):
+    """Counts and bytes to add, update and delete for one system."""
+    plan = {"add": [0, 0], "update": [0, 0], "delete": [0, 0], "grow": 0, "largest": 0}
+    for rel, (size, mtime_ns) in src_files.items():
+        current = dst_files.get(rel)
+        if current is None:
+            kind = "add"
+        elif current[0] != size or abs(current[1] - mtime_ns) > copy_engine.MTIME_WINDOW * 1_000_000_000:
+            kind = "update"
+            plan["grow"] -= current[0]
         else:
-            sync_with_rsync(sub, target_dst, excludes)
+            continue
+        plan[kind][0] += 1
+        plan[kind][1] += size
+        plan["grow"] += size
+        plan["largest"] = max(plan["largest"], size)
+    for rel, (size, _) in dst_files.items():
+        if rel not in src_files:
+            plan["delete"][0] += 1
+            plan["delete"][1] += size
+    if args.mirror:
+        plan["grow"] -= plan["delete"][1]
+    return plan
+
+def build_plan(work):
+    """Scan every system's source and destination in parallel and diff them."""
+    with ThreadPoolExecutor(max_workers=max(4, jobs * 2)) as pool:
+        scans = {(src, side): pool.submit(scan_tree, path, excludes)
+                 for src, dst, excludes in work
+                 for side, path in (("src", src), ("dst", dst))}
+        return {src: plan_system(scans[src, "src"].result(), scans[src, "dst"].result())
+                for src, _, _ in work}
+
+def format_bytes(num):
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(num) < 1024:
+            return f"{num:.1f} {unit}" if unit != "B" else f"{num} B"
+        num /= 1024
+    return f"{num:.2f} TB"
+
+def print_plan(work, plan):
+    print("\n🧮 Transfer plan")
+    print("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+    for src, _, _ in work:
+        p = plan[src]
+        parts = [f"{label} {p[kind][0]} ({format_bytes(p[kind][1])})"
+                 for kind, label in (("add", "+"), ("update", "~"), ("delete", "-")) if p[kind][0]]
+        print(f"   {src.name:<16} {'  '.join(parts) if parts else 'up to date'}")
+    total = {kind: sum(p[kind][1] for p in plan.values()) for kind in ("add", "update", "delete")}
+    print("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+    print(f"   To copy: {format_bytes(total['add'] + total['update'])}"
+          f" / {'to delete' if args.mirror else 'extra in destination'}: {format_bytes(total['delete'])}")
+
+def fit_to_free_space(work, plan):
+    """Return the work that fits on each destination disk, or exit when --on-full is refuse."""
+    free = {}
+    needed = {}
+    largest = {}
+    labels = {}
+    for src, dst, _ in work:
+        key = device_key(dst)
+        if key not in free:
+            path = dst
+            while not path.exists():
+                path = path.parent
+            free[key] = shutil.disk_usage(path).free
+            labels[key] = path
+        needed[key] = needed.get(key, 0) + max(plan[src]["grow"], 0)
+        largest[key] = max(largest.get(key, 0), plan[src]["largest"])
+    # rsync and robocopy write a whole file before replacing it, so keep room for the largest one.
+    for key in needed:
+        needed[key] += largest[key]
+
+    full = [key for key in needed if needed[key] > free[key]]
+    if not full:
+        return work
+    for key in full:
+        print(f"\n💾 Destination {labels[key]} needs {format_bytes(needed[key])} but only {format_bytes(free[key])} is free")
+    if args.on_full == "refuse":
+        print("❌ Refusing to sync. Free up space, narrow --systems, or pass --on-full trim.")
+        sys.exit(1)
 
-        summary["synced"].append(sub.name)
+    # Keep systems in order and drop any that would overflow their destination.
+    kept = []
+    used = {}
+    for src, dst, excludes in work:
+        key = device_key(dst)
+        grow = max(plan[src]["grow"], 0)
+        if used.get(key, 0) + grow + plan[src]["largest"] > free[key]:
+            summary["skipped_no_space"].append(src.name)
+            print(f"✂️  Dropping '{src.name}' ({format_bytes(grow)}) — not enough free space")
+            continue
+        used[key] = used.get(key, 0) + grow
+        kept.append((src, dst, excludes))
+    return kept
 
 def print_summary():
     print("\n\n🔄 Sync Summary")
@@ -226,14 +661,24 @@ def print_summary():
 
     if summary["synced"]:
         print(f"✅ Synced: {', '.join(sorted(summary['synced']))}")
+    if summary["failed"]:
+        print(f"❌ Failed: {', '.join(sorted(summary['failed']))}")
     if summary["skipped_filtered"]:
         print(f"🚫 Filtered: {', '.join(sorted(summary['skipped_filtered']))}")
     if summary["skipped_missing_dst"]:
         print(f"⚠️  Missing DST: {', '.join(sorted(summary['skipped_missing_dst']))}")
+    if summary["skipped_no_space"]:
+        print(f"💾 No space: {', '.join(sorted(summary['skipped_no_space']))}")
     
     print("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
-    total = sum(len(v) for k, v in summary.items() if k != "extras")
-    print(f"{total} attempted / {len(summary['synced'])} synced / {len(summary['missing_src'])} missing / {len(summary['skipped_filtered']) + len(summary['skipped_missing_dst'])} skipped")
+    total = sum(len(v) for v in summary.values() if isinstance(v, list))
+    print(f"{total} attempted / {len(summary['synced'])} synced / {len(summary['failed'])} failed / {len(summary['missing_src'])} missing / {len(summary['skipped_filtered']) + len(summary['skipped_missing_dst']) + len(summary['skipped_no_space'])} skipped")
+
+    slowest = sorted(summary["stats"].items(), key=lambda item: item[1]["duration_s"], reverse=True)[:3]
+    if slowest:
+        print("🐢 Slowest: " + ", ".join(
+            f"{system} {stats['duration_s']:.0f}s ({stats['copied_files']} files, {format_bytes(stats['bytes_per_s'])}/s)"
+            for system, stats in slowest))
 
     if dry_run:
         print("\n📋 Files/Folders in destination but not in source (from robocopy *EXTRA output):")
@@ -246,11 +691,35 @@ def print_summary():
                     print(f"   {line}")
 
 def main():
-    print("🔁 Starting sync " + ("(dry run)" if dry_run else "(real run)") + "...\n")
+    print("🔁 Starting sync " + ("(dry run)" if dry_run else "(real run)") + (" with the native engine" if use_native else "") + "...\n")
     normalized_excludes = normalize_excludes(args.exclude)
+    work = []
     for label, src, dst in FOLDER_TARGETS:
-        sync_folder(src, dst, normalized_excludes)
+        work.extend(sync_folder(src, dst, normalized_excludes))
+
+    sizes = None
+    if not args.no_plan and work:
+        plan = build_plan(work)
+        print_plan(work, plan)
+        if args.plan_only:
+            return
+        if not dry_run:
+            work = fit_to_free_space(work, plan)
+        # Systems with nothing to copy or delete need no robocopy/rsync run at all.
+        pending = []
+        for w in work:
+            p = plan[w[0]]
+            if p["add"][0] or p["update"][0] or (args.mirror and p["delete"][0]):
+                pending.append(w)
+            else:
+                summary["synced"].append(w[0].name)
+        work = pending
+        sizes = {src: plan[src]["add"][1] + plan[src]["update"][1] for src, _, _ in work}
+    run_sync_jobs(work, sizes)
     print_summary()
+    if summary["stats"] or summary["failed"]:
+        write_report(args.report)
+        print(f"\n📝 Per-file changes and timings written to {args.report}")
     print("\n⚠️  Only synced subfolders — files in root SRC are ignored.")
     print("⚠️  These will NOT be deleted unless you use the --mirror flag.\n")
 